@@ -0,0 +1,102 @@
+"""
+Create or update the Supabase schema.
+
+Run explicitly before deploying, not at import or startup:
+    python -m app.migrate          # apply the schema (idempotent)
+    python -m app.migrate --check  # only check that the recipes table exists
+"""
+from supabase import create_client
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# SQL to create the recipes table
+CREATE_RECIPES_TABLE = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    ingredients JSONB NOT NULL,
+    instructions JSONB NOT NULL,
+    cooking_time JSONB NOT NULL,
+    difficulty TEXT NOT NULL,
+    servings INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    rating FLOAT DEFAULT 0,
+    total_ratings INTEGER DEFAULT 0,
+    nutritional_info JSONB,
+    tags JSONB,
+    tips JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW())
+);
+
+-- Optional recipe fields, for tables created before they were added
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS nutritional_info JSONB;
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS tags JSONB;
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS tips JSONB;
+
+-- Create index on user_id for faster queries
+CREATE INDEX IF NOT EXISTS idx_recipes_user_id ON recipes(user_id);
+
+-- Create index on rating for sorting
+CREATE INDEX IF NOT EXISTS idx_recipes_rating ON recipes(rating);
+
+-- Composite indexes for keyset pagination of a user's recipes
+CREATE INDEX IF NOT EXISTS idx_recipes_user_created ON recipes(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_recipes_user_rating ON recipes(user_id, rating DESC, id DESC);
+
+-- Create index on difficulty for filtering
+CREATE INDEX IF NOT EXISTS idx_recipes_difficulty ON recipes(difficulty);
+
+-- Atomically fold p_count ratings summing to p_sum into a recipe's average
+CREATE OR REPLACE FUNCTION increment_recipe_rating(p_recipe_id UUID, p_sum FLOAT, p_count INTEGER)
+RETURNS SETOF recipes AS $$
+    UPDATE recipes
+    SET rating = (rating * total_ratings + p_sum) / (total_ratings + p_count),
+        total_ratings = total_ratings + p_count,
+        updated_at = TIMEZONE('utc'::text, NOW())
+    WHERE id = p_recipe_id
+    RETURNING *;
+$$ LANGUAGE sql;
+"""
+
+def check_db(supabase) -> bool:
+    """Return whether the recipes table exists."""
+    try:
+        supabase.table("recipes").select("id").limit(1).execute()
+        return True
+    except Exception as e:
+        if "does not exist" in str(e):
+            return False
+        raise e
+
+def migrate(supabase):
+    """
+    Apply the schema. Every statement is idempotent, so this also adds
+    indexes and functions introduced after the table was first created.
+    """
+    supabase.rpc('exec_sql', {'sql': CREATE_RECIPES_TABLE}).execute()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create or update the ChefGPT database schema.")
+    parser.add_argument("--check", action="store_true", help="only check that the schema exists")
+    args = parser.parse_args(argv)
+
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    if args.check:
+        if check_db(supabase):
+            print("Recipes table exists")
+            return 0
+        print("Recipes table does not exist, run: python -m app.migrate")
+        return 1
+
+    migrate(supabase)
+    print("Schema is up to date")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
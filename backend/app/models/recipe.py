@@ -1,17 +1,30 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
+class RecipeIngredient(BaseModel):
+    name: str
+    amount: Optional[Union[str, float]] = None
+    unit: Optional[str] = None
+
+class CookingTime(BaseModel):
+    prep_time: Optional[int] = None  # in minutes
+    cook_time: Optional[int] = None
+    total_time: Optional[int] = None
+
 class RecipeBase(BaseModel):
     title: str
-    ingredients: List[str]
+    description: Optional[str] = ""
+    ingredients: List[Union[RecipeIngredient, str]]
     instructions: List[str]
-    cooking_time: int  # in minutes
+    cooking_time: Union[CookingTime, int]  # in minutes when a plain number
     difficulty: str
     servings: int
 
 class RecipeCreate(RecipeBase):
-    pass
+    tags: Optional[List[str]] = None
+    tips: Optional[List[str]] = None
+    nutritional_info: Optional[Dict[str, Any]] = None
 
 class Recipe(RecipeBase):
     id: str
@@ -25,4 +38,8 @@ class Recipe(RecipeBase):
 
 class RecipeRating(BaseModel):
     recipe_id: str
-    rating: float  # 1-5 
\ No newline at end of file
+    rating: float  # 1-5 
+
+class GeneratedRecipe(RecipeBase):
+    """A recipe as returned by the model, before it is saved."""
+    model_config = ConfigDict(extra="allow")
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-from pydantic import BaseModel
-from app.services.recipe_service import generate_recipe, save_recipe, get_user_recipes, rate_recipe
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+import hashlib
+import json
+import os
+import re
+from app.services.recipe_service import generate_recipe, stream_recipe, generate_recipe_batch, match_recipes, save_recipe, get_user_recipes, export_user_recipes, import_user_recipes, rate_recipe, DEFAULT_PAGE_SIZE
+from app.services.recipe_stream import format_sse
+from app.services.generation_engine import EngineOverloaded, EngineTimeout
+from app.services.llm_client import LLMUpstreamError
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
@@ -13,6 +21,39 @@ class RecipeGenerationRequest(BaseModel):
     servings: Optional[int] = None
     user_id: Optional[str] = None
 
+class RecipeMatchRequest(RecipeGenerationRequest):
+    limit: int = Field(5, ge=1, le=20)
+    fallback: bool = True
+
+class BatchGenerationRequest(BaseModel):
+    requests: List[RecipeGenerationRequest]
+    stream: bool = False
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "20"))
+MAX_PAGE_SIZE = 200
+
+def _error_response(e: Exception) -> Tuple[int, str]:
+    """Map a generation error to the status code the single endpoint would use."""
+    if isinstance(e, EngineOverloaded):
+        return 503, str(e)
+    if isinstance(e, EngineTimeout):
+        return 504, str(e)
+    if isinstance(e, LLMUpstreamError):
+        return e.status_code, str(e)
+    if isinstance(e, ValueError):
+        return 400, str(e)
+    return 500, str(e)
+
+def _filename_part(value: str) -> str:
+    """``value`` reduced to characters that are safe in a quoted header filename."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value)[:64] or "user"
+
+def _batch_item(index: int, recipe: Optional[Dict], error: Optional[Exception]) -> Dict:
+    if error is not None:
+        status_code, detail = _error_response(error)
+        return {"index": index, "status": "error", "status_code": status_code, "error": detail}
+    return {"index": index, "status": "ok", "recipe": recipe}
+
 @router.post("/generate")
 async def create_recipe(request: RecipeGenerationRequest):
     """Generate a recipe based on ingredients and preferences."""
@@ -25,27 +66,219 @@ async def create_recipe(request: RecipeGenerationRequest):
             servings=request.servings
         )
         return recipe_data
+    except EngineOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except EngineTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except LLMUpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate/stream")
+async def create_recipe_stream(request: RecipeGenerationRequest):
+    """Generate a recipe, streaming it back as server-sent events."""
+    events = stream_recipe(
+        ingredients=request.ingredients,
+        dietary_preferences=request.dietary_preferences,
+        cooking_time=request.cooking_time,
+        difficulty=request.difficulty,
+        servings=request.servings
+    )
+
+    # Pull the first event before responding so capacity and upstream
+    # errors still map to a proper status code.
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="Empty response from recipe generator")
+    except EngineOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except EngineTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except LLMUpstreamError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield format_sse(*first)
+        try:
+            async for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/match")
+async def match_recipe(request: RecipeMatchRequest):
+    """
+    Find saved recipes that use the given ingredients and fit the constraints.
+
+    Returns the best-scoring stored recipes (``source: "index"``). When none
+    qualify, generates a new recipe (``source: "generated"``) unless
+    ``fallback`` is false, in which case the list is empty.
+    """
+    try:
+        recipes = await match_recipes(
+            ingredients=request.ingredients,
+            dietary_preferences=request.dietary_preferences,
+            cooking_time=request.cooking_time,
+            difficulty=request.difficulty,
+            servings=request.servings,
+            limit=request.limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if recipes:
+        return {"source": "index", "recipes": recipes}
+    if not request.fallback:
+        return {"source": "none", "recipes": []}
+    return {"source": "generated", "recipes": [await create_recipe(request)]}
+
+@router.post("/generate/batch")
+async def create_recipe_batch(batch: BatchGenerationRequest):
+    """
+    Generate several recipes concurrently with per-item results.
+
+    With ``stream`` set, each result is sent as an NDJSON line as soon as it
+    completes; otherwise all results are returned together in request order.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(batch.requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch size cannot exceed {BATCH_MAX_SIZE}")
+
+    requests = [r.model_dump(exclude={"user_id"}) for r in batch.requests]
+
+    if batch.stream:
+        async def body():
+            async for index, recipe, error in generate_recipe_batch(requests):
+                yield json.dumps(_batch_item(index, recipe, error)) + "\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    results = [
+        _batch_item(index, recipe, error)
+        async for index, recipe, error in generate_recipe_batch(requests)
+    ]
+    results.sort(key=lambda item: item["index"])
+    failed = sum(1 for item in results if item["status"] == "error")
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+@router.post("/import")
+async def import_recipes(user_id: str, request: Request):
+    """
+    Import recipes for a user from an NDJSON body, one recipe per line.
+
+    Lines are validated and inserted in batches as the body streams in.
+    Invalid lines are skipped and reported by line number.
+    """
+    try:
+        return await import_user_recipes(request.stream(), user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/export")
+async def export_recipes(user_id: str):
+    """Stream all of a user's recipes as NDJSON, newest first."""
+    rows = export_user_recipes(user_id)
+    # Fetch the first page before responding so store errors get a status code
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        if first is None:
+            return
+        yield json.dumps(first, default=str) + "\n"
+        async for row in rows:
+            yield json.dumps(row, default=str) + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="recipes-{_filename_part(user_id)}.ndjson"'}
+    )
+
 @router.get("/{user_id}")
-async def get_recipes(user_id: str):
-    """Get all recipes for a user."""
+async def get_recipes(
+    user_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    sort: str = "created_at",
+    order: str = Query("desc", pattern="^(asc|desc)$")
+):
+    """
+    Get a page of recipes for a user.
+
+    The body is the list of recipes; the cursor for the next page is returned
+    in the ``X-Next-Cursor`` header. ``fields`` is a comma-separated list of
+    columns to return. Unchanged pages answer ``If-None-Match`` with 304.
+    """
     try:
-        recipes = await get_user_recipes(user_id)
-        return recipes
+        recipes, next_cursor = await get_user_recipes(
+            user_id,
+            limit=limit,
+            cursor=cursor,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            difficulty=difficulty,
+            min_rating=min_rating,
+            sort=sort,
+            descending=order == "desc"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    body = json.dumps(recipes, default=str, separators=(",", ":"))
+    etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.post("/{recipe_id}/rate")
 async def rate_recipe_endpoint(recipe_id: str, rating: float):
     """Rate a recipe."""
+    if not 0 <= rating <= 5:
+        raise HTTPException(status_code=400, detail="Rating must be between 0 and 5")
     try:
-        if not 0 <= rating <= 5:
-            raise HTTPException(status_code=400, detail="Rating must be between 0 and 5")
         updated_recipe = await rate_recipe(recipe_id, rating)
-        return updated_recipe
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    if updated_recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if updated_recipe.get("queued"):
+        return JSONResponse(status_code=202, content=updated_recipe)
+    return updated_recipe 
\ No newline at end of file
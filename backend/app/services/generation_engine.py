@@ -0,0 +1,200 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class EngineError(Exception):
+    """Base class for errors raised by the generation engine."""
+
+
+class EngineOverloaded(EngineError):
+    """Raised when the engine has no free slot and the wait queue is full."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EngineTimeout(EngineError):
+    """Raised when a call does not finish within its deadline."""
+
+
+class GenerationEngine:
+    """
+    Runs blocking LLM SDK calls on a dedicated thread pool so they never block
+    the event loop.
+
+    At most ``max_concurrency`` calls run at once. Up to ``max_queue`` further
+    callers may wait for a slot (each for at most ``queue_timeout`` seconds);
+    anything beyond that is rejected immediately with ``EngineOverloaded``.
+    A slot is only returned once the worker thread has actually finished, so a
+    timed-out call still counts against the limit until the SDK gives up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        request_timeout: float = 60.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    @classmethod
+    def from_env(cls) -> "GenerationEngine":
+        return cls(
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+            max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "64")),
+            queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", "10")),
+            request_timeout=float(os.getenv("GEMINI_REQUEST_TIMEOUT", "60")),
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="gemini",
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire(self) -> None:
+        semaphore = self._get_semaphore()
+        if not semaphore.locked():
+            # Fast path: a free slot is taken without suspending.
+            await semaphore.acquire()
+            self._in_flight += 1
+            return
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise EngineOverloaded("Recipe generation is at capacity, please retry shortly")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise EngineOverloaded("Timed out waiting for a free generation slot")
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+
+    def _release(self, _future: Any = None) -> None:
+        self._in_flight -= 1
+        self._get_semaphore().release()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the engine's thread pool."""
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self._get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            # shield() keeps the slot held until the thread is really done,
+            # even if we stop waiting for it.
+            return await asyncio.wait_for(
+                asyncio.shield(future), timeout=timeout or self.request_timeout
+            )
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise EngineTimeout("Recipe generation timed out")
+
+    async def iterate(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Call ``fn(*args, **kwargs)`` on the thread pool and yield the items of
+        the blocking iterable it returns, e.g. a streamed SDK response.
+
+        The slot is held for the whole stream and ``timeout`` bounds the
+        total time until the last item.
+        """
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce() -> None:
+            # Each queue entry is (finished, item_or_error)
+            try:
+                for item in fn(*args, **kwargs):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (False, item))
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (True, e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (True, None))
+
+        try:
+            future = loop.run_in_executor(self._get_executor(), produce)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        deadline = loop.time() + (timeout or self.request_timeout)
+        try:
+            while True:
+                try:
+                    finished, item = await asyncio.wait_for(
+                        queue.get(), timeout=max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    self._timed_out += 1
+                    raise EngineTimeout("Recipe generation timed out")
+                if finished:
+                    if item is not None:
+                        raise item
+                    return
+                yield item
+        finally:
+            # Let the producer thread stop early if the consumer went away
+            stop.set()
+
+    def has_free_slot(self) -> bool:
+        """Whether a call started now would run without waiting."""
+        return not self._get_semaphore().locked()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+engine = GenerationEngine.from_env()
@@ -0,0 +1,99 @@
+import os
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from dotenv import load_dotenv
+
+from .logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("llm")
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Used while the primary model's circuit breaker is open; empty disables it
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "")
+
+_model: Optional[Any] = None
+_fallback_model: Optional[Any] = None
+
+
+def is_configured() -> bool:
+    """Whether a model is set or can be created, without touching the network."""
+    return _model is not None or bool(os.getenv("GOOGLE_API_KEY"))
+
+
+def _create_model(name: str) -> Any:
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY environment variable is not set")
+    # Imported here rather than at module level: the SDK (grpc, protobuf)
+    # is the slowest import in the app.
+    import google.generativeai as genai
+
+    logger.info("Configuring Google AI", extra={"model": name})
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(name)
+
+
+def get_model() -> Any:
+    """Return the Gemini model, configuring the SDK on first use."""
+    global _model
+    if _model is None:
+        _model = _create_model(GEMINI_MODEL)
+    return _model
+
+
+def get_fallback_model() -> Optional[Any]:
+    """Return the fallback model, or ``None`` if none is configured."""
+    global _fallback_model
+    if _fallback_model is None and GEMINI_FALLBACK_MODEL:
+        _fallback_model = _create_model(GEMINI_FALLBACK_MODEL)
+    return _fallback_model
+
+
+def set_model(model: Optional[Any]) -> None:
+    """Replace the model, e.g. with a local stand-in; ``None`` resets it."""
+    global _model
+    _model = model
+
+
+def set_fallback_model(model: Optional[Any]) -> None:
+    """Replace the fallback model; ``None`` resets it."""
+    global _fallback_model
+    _fallback_model = model
+
+
+def response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Convert a pydantic model into the OpenAPI subset Gemini accepts as a
+    ``response_schema``: references are inlined, and for unions the first
+    non-null variant is used (a null variant makes the field nullable).
+    """
+    schema = model.model_json_schema()
+    definitions = schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            return convert(definitions[node["$ref"].rsplit("/", 1)[-1]])
+        if "anyOf" in node:
+            variants = [v for v in node["anyOf"] if v.get("type") != "null"]
+            converted = convert(variants[0])
+            if len(variants) < len(node["anyOf"]):
+                converted["nullable"] = True
+        else:
+            converted = {"type": node["type"]}
+            if "enum" in node:
+                converted["enum"] = node["enum"]
+            if node["type"] == "array":
+                converted["items"] = convert(node["items"])
+            if node["type"] == "object":
+                converted["properties"] = {k: convert(v) for k, v in node.get("properties", {}).items()}
+                if node.get("required"):
+                    converted["required"] = list(node["required"])
+        if "description" in node and node is not schema:
+            converted["description"] = node["description"]
+        return converted
+
+    return convert(schema)
@@ -0,0 +1,391 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+from .generation_engine import EngineError, EngineOverloaded, EngineTimeout, engine
+from .llm import GEMINI_FALLBACK_MODEL, GEMINI_MODEL, get_fallback_model, get_model
+from .logger import get_logger
+from .metrics import LLM_HEDGES, LLM_RETRIES, record_token_usage, stage
+
+load_dotenv()
+
+logger = get_logger("llm_client")
+
+T = TypeVar("T")
+
+# Status codes of Google API errors worth retrying (rate limited or server side)
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMUnavailable(EngineOverloaded):
+    """Raised when every model's circuit breaker is open."""
+
+
+class LLMUpstreamError(EngineError):
+    """
+    Raised when the model kept failing on its side (rate limited, server
+    errors, dropped connections) after retries. ``status_code`` is 503 when
+    it was overloaded or rate limiting, 502 otherwise.
+    """
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Retry reasons that mean the model, not the request, is at fault
+UPSTREAM_REASONS = frozenset({"upstream", "connection"})
+
+
+def upstream_error(error: BaseException) -> LLMUpstreamError:
+    status_code = 503 if getattr(error, "code", None) in (429, 503) else 502
+    return LLMUpstreamError(f"Recipe generation failed upstream: {error}", status_code=status_code)
+
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """Why ``error`` is worth retrying, or ``None`` if it isn't."""
+    if isinstance(error, EngineOverloaded):
+        # Retrying would only add load; the caller gets a 503 instead
+        return None
+    if isinstance(error, EngineTimeout):
+        return "timeout"
+    if isinstance(error, ValueError):
+        return "parse"
+    if isinstance(error, ConnectionError):
+        return "connection"
+    # google.api_core errors carry the HTTP status as ``code``
+    if getattr(error, "code", None) in RETRYABLE_STATUS_CODES:
+        return "upstream"
+    return None
+
+
+class CircuitBreaker:
+    """
+    Tracks a model's recent call outcomes and opens when too many fail.
+
+    Opens when at least ``min_calls`` calls in the last ``window`` seconds
+    have a failure rate of ``failure_rate`` or more. After ``cooldown``
+    seconds one probe call is let through: success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, window: float = 30.0, min_calls: int = 10, failure_rate: float = 0.5, cooldown: float = 30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._opened_at: Optional[float] = None
+        # When the current probe was let through; a probe that never reports
+        # back (cancelled, or failed for an unrelated reason) expires
+        self._probe_at: Optional[float] = None
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> int:
+        if self._opened_at is None:
+            return 0
+        return max(1, int(self.cooldown - (time.monotonic() - self._opened_at)) + 1)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half_open" and (self._probe_at is None or now - self._probe_at > self.cooldown):
+            self._probe_at = now
+            return True
+        return False
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._probe_at = None
+        self._outcomes.clear()
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            if self._probe_at is None:
+                # A call from before the breaker opened
+                return
+            self._opened_at = None
+            self._probe_at = None
+        now = time.monotonic()
+        self._outcomes.append((now, True))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        if self._opened_at is not None:
+            if self._probe_at is not None:
+                self._open(now)
+            return
+        self._outcomes.append((now, False))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._open(now)
+            self.opened += 1
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to time hedged requests."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """The ``pct`` percentile latency, or ``None`` until there are enough samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LLMClient:
+    """
+    Calls Gemini through the generation engine with tail-latency controls:
+
+    - a deadline for the whole call, including retries and hedges;
+    - a hedged second request when the first hasn't answered after the
+      ``hedge_percentile`` latency and a slot is free; the first usable
+      response wins and the other is abandoned;
+    - retries with full jitter for retryable errors and unparseable
+      responses, while the deadline allows;
+    - a circuit breaker per model that switches to the fallback model (or
+      fails fast with ``LLMUnavailable``) when the error rate spikes.
+    """
+
+    def __init__(
+        self,
+        deadline: float = 45.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 4.0,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 1.0,
+        breaker_window: float = 30.0,
+        breaker_min_calls: int = 10,
+        breaker_failure_rate: float = 0.5,
+        breaker_cooldown: float = 30.0,
+    ):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+        self.breakers = {
+            name: CircuitBreaker(breaker_window, breaker_min_calls, breaker_failure_rate, breaker_cooldown)
+            for name in ("primary", "fallback")
+        }
+        self.fallback_calls = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        return cls(
+            deadline=float(os.getenv("GEMINI_DEADLINE", "45")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("GEMINI_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("GEMINI_BACKOFF_MAX", "4")),
+            hedge_percentile=float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95")),
+            hedge_min_delay=float(os.getenv("GEMINI_HEDGE_MIN_DELAY", "1")),
+            breaker_window=float(os.getenv("GEMINI_BREAKER_WINDOW", "30")),
+            breaker_min_calls=int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "10")),
+            breaker_failure_rate=float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", "0.5")),
+            breaker_cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30")),
+        )
+
+    def _select_model(self) -> Tuple[str, Any]:
+        """Pick the primary model, or the fallback while the primary's breaker is open."""
+        if self.breakers["primary"].allow():
+            return "primary", get_model()
+        if self.breakers["fallback"].allow():
+            fallback = get_fallback_model()
+            if fallback is not None:
+                self.fallback_calls += 1
+                return "fallback", fallback
+        retry_after = self.breakers["primary"].retry_after()
+        raise LLMUnavailable("Recipe generation is temporarily unavailable", retry_after=retry_after)
+
+    def _record(self, model_name: str, error: Optional[BaseException]) -> None:
+        breaker = self.breakers[model_name]
+        if error is None:
+            breaker.record_success()
+        elif isinstance(error, EngineOverloaded) or retry_reason(error) is None:
+            # Our own load shedding and bad requests say nothing about the model
+            pass
+        else:
+            breaker.record_failure()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile <= 0:
+            return None
+        delay = self.latency.percentile(self.hedge_percentile)
+        return None if delay is None else max(delay, self.hedge_min_delay)
+
+    async def _attempt(
+        self, model_name: str, model: Any, prompt: str, generation_config: Dict, parse: Callable[[str], T], deadline: float
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise EngineTimeout("Recipe generation timed out")
+        start = loop.time()
+        try:
+            with stage("llm"):
+                response = await engine.run(
+                    model.generate_content, prompt, generation_config=generation_config, timeout=remaining
+                )
+        except Exception as e:
+            self._record(model_name, e)
+            raise
+        self._record(model_name, None)
+        if model_name == "primary":
+            self.latency.observe(loop.time() - start)
+        record_token_usage(response, generation_config.get("max_output_tokens"))
+        with stage("parse"):
+            return parse(response.text)
+
+    async def _hedged(
+        self, model_name: str, model: Any, prompt: str, generation_config: Dict, parse: Callable[[str], T], deadline: float
+    ) -> T:
+        loop = asyncio.get_running_loop()
+
+        def start() -> asyncio.Task:
+            return asyncio.ensure_future(self._attempt(model_name, model, prompt, generation_config, parse, deadline))
+
+        tasks = {start()}
+        hedge_delay = self._hedge_delay()
+        hedged = hedge_delay is None
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                timeout = deadline - loop.time()
+                if not hedged:
+                    timeout = min(timeout, hedge_delay)
+                done, tasks = await asyncio.wait(tasks, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+                if done:
+                    continue
+                if loop.time() >= deadline:
+                    raise EngineTimeout("Recipe generation timed out")
+                # The first request is slow: hedge once, only if it won't queue
+                hedged = True
+                if engine.has_free_slot():
+                    LLM_HEDGES.inc()
+                    tasks.add(start())
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def generate(self, prompt: str, generation_config: Dict, parse: Callable[[str], T]) -> T:
+        """
+        Generate a response for ``prompt`` and return ``parse(response.text)``.
+
+        ``parse`` raising ``ValueError`` counts as a failed attempt, so an
+        unusable response is retried like a transient error.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            model_name, model = self._select_model()
+            try:
+                return await self._hedged(model_name, model, prompt, generation_config, parse, deadline)
+            except Exception as e:
+                reason = retry_reason(e)
+                # Full jitter: spread retries so they don't arrive together
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if reason is None or attempt >= self.max_retries or loop.time() + delay >= deadline:
+                    if reason in UPSTREAM_REASONS:
+                        raise upstream_error(e) from e
+                    raise
+                attempt += 1
+                LLM_RETRIES.inc(reason)
+                logger.warning(
+                    "Retrying LLM call",
+                    extra={"reason": reason, "attempt": attempt, "model": model_name, "delay": round(delay, 3)}
+                )
+                await asyncio.sleep(delay)
+
+    async def stream(self, prompt: str, generation_config: Dict) -> AsyncIterator[Any]:
+        """
+        Stream response chunks for ``prompt`` within the deadline. Errors
+        before the first chunk are retried; once output has been sent they
+        are raised, since the caller can't take it back.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            model_name, model = self._select_model()
+            chunk = None
+            failed = False
+            chunks = engine.iterate(
+                model.generate_content,
+                prompt,
+                generation_config=generation_config,
+                stream=True,
+                timeout=max(deadline - loop.time(), 0.001)
+            )
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                failed = True
+                self._record(model_name, e)
+                reason = retry_reason(e)
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if chunk is not None or reason is None or attempt >= self.max_retries or loop.time() + delay >= deadline:
+                    if reason in UPSTREAM_REASONS:
+                        raise upstream_error(e) from e
+                    raise
+                attempt += 1
+                LLM_RETRIES.inc(reason)
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                await chunks.aclose()
+                if chunk is not None:
+                    # The last chunk carries the usage for the whole response
+                    record_token_usage(chunk, generation_config.get("max_output_tokens"))
+                    # Also when the caller stopped reading early
+                    if not failed:
+                        self._record(model_name, None)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": GEMINI_MODEL,
+            "fallback_model": GEMINI_FALLBACK_MODEL or None,
+            "breakers": {name: breaker.state for name, breaker in self.breakers.items()},
+            "breaker_opened": {name: breaker.opened for name, breaker in self.breakers.items()},
+            "fallback_calls": self.fallback_calls,
+            "hedge_delay": self._hedge_delay(),
+        }
+
+
+llm_client = LLMClient.from_env()
@@ -0,0 +1,228 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Per-request list of (stage, seconds), rendered as the Server-Timing header
+server_timing_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timing", default=None)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    A value read from a callback at scrape time, so it costs nothing on the
+    hot path. Used for gauges and for counters kept by other components.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float], kind: str = "gauge"):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name} {self.callback()}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = register(Histogram(
+    "chefgpt_stage_seconds",
+    "Time spent in each stage of the recipe pipeline.",
+    ["stage"],
+))
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "chefgpt_http_request_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+))
+LLM_TOKENS = register(Counter(
+    "chefgpt_llm_tokens_total",
+    "Tokens sent to and received from the LLM.",
+    ["type"],
+))
+LLM_OUTPUT_TOKENS = register(Histogram(
+    "chefgpt_llm_output_tokens",
+    "Output tokens per LLM response.",
+    buckets=(64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096),
+))
+LLM_OUTPUT_BUDGET_USED = register(Histogram(
+    "chefgpt_llm_output_budget_used_ratio",
+    "Output tokens per LLM response as a share of its max_output_tokens budget.",
+    buckets=(0.25, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+))
+PARSE_RESULTS = register(Counter(
+    "chefgpt_parse_results_total",
+    "Outcomes of parsing LLM responses (clean, repaired, failed, invalid).",
+    ["result"],
+))
+RECIPE_MATCHES = register(Counter(
+    "chefgpt_recipe_matches_total",
+    "Recipe match lookups by whether a saved recipe qualified (hit, miss).",
+    ["result"],
+))
+LLM_RETRIES = register(Counter(
+    "chefgpt_llm_retries_total",
+    "LLM calls retried after a retryable error or an unparseable response.",
+    ["reason"],
+))
+LLM_HEDGES = register(Counter(
+    "chefgpt_llm_hedged_requests_total",
+    "Second LLM requests sent because the first was slower than the hedge delay.",
+))
+
+_http_in_flight = 0
+
+
+def http_in_flight() -> int:
+    return _http_in_flight
+
+
+register(CallbackMetric("chefgpt_http_requests_in_flight", "HTTP requests being served.", http_in_flight))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram and the Server-Timing header."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        timings = server_timing_var.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+@contextmanager
+def track_request() -> Iterator[List[Tuple[str, float]]]:
+    """Count a request as in flight and collect its stage timings."""
+    global _http_in_flight
+    timings: List[Tuple[str, float]] = []
+    token = server_timing_var.set(timings)
+    _http_in_flight += 1
+    try:
+        yield timings
+    finally:
+        _http_in_flight -= 1
+        server_timing_var.reset(token)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def record_token_usage(response, output_budget: Optional[int] = None) -> None:
+    """
+    Count prompt/output tokens from a Gemini response, when the SDK reports
+    them, and how much of the output budget the response used.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    if prompt_tokens:
+        LLM_TOKENS.inc("prompt", amount=prompt_tokens)
+    if output_tokens:
+        LLM_TOKENS.inc("output", amount=output_tokens)
+        LLM_OUTPUT_TOKENS.observe(output_tokens)
+        if output_budget:
+            LLM_OUTPUT_BUDGET_USED.observe(output_tokens / output_budget)
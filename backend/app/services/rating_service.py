@@ -0,0 +1,140 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .logger import get_logger
+from .recipe_index import recipe_index
+from .recipe_repository import RepositoryError, get_recipe_repository
+
+load_dotenv()
+
+logger = get_logger("rating_service")
+
+
+async def apply_rating(recipe_id: str, rating_sum: float, rating_count: int) -> Optional[Dict]:
+    """
+    Atomically add ``rating_count`` ratings totalling ``rating_sum`` to a recipe.
+
+    The increment happens in the store in a single step (for Supabase, the
+    ``increment_recipe_rating`` function in the schema), so concurrent
+    ratings can't overwrite each other. Returns the updated recipe, or
+    ``None`` if it doesn't exist.
+    """
+    recipe = await get_recipe_repository().rate(recipe_id, rating_sum, rating_count)
+    if recipe is not None:
+        recipe_index.update_rating(recipe_id, recipe.get("rating"))
+    return recipe
+
+
+class RatingAggregator:
+    """
+    Write-behind buffer for ratings.
+
+    Ratings are summed per recipe in memory and flushed as one atomic increment
+    per recipe, either every ``flush_interval`` seconds or as soon as
+    ``flush_size`` ratings are pending. Ratings from a failed flush are put
+    back and retried on the next one, up to ``max_attempts`` flushes; ratings
+    the store rejects outright (a 4xx, e.g. an unknown function or a bad id)
+    are dropped at once.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, flush_size: int = 100, max_attempts: int = 5):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_attempts = max_attempts
+        # recipe_id -> [rating_sum, rating_count, failed flushes]
+        self._pending: Dict[str, List] = {}
+        self._pending_count = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        # A flush started because the buffer filled up, held so it isn't
+        # garbage collected mid-write and so stop() can wait for it
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls) -> "RatingAggregator":
+        return cls(
+            flush_interval=float(os.getenv("RATING_FLUSH_INTERVAL", "2")),
+            flush_size=int(os.getenv("RATING_FLUSH_SIZE", "100")),
+            max_attempts=int(os.getenv("RATING_FLUSH_MAX_ATTEMPTS", "5")),
+        )
+
+    def add(self, recipe_id: str, rating: float) -> int:
+        """Queue a rating and return how many are pending for the recipe."""
+        entry = self._pending.setdefault(recipe_id, [0.0, 0, 0])
+        entry[0] += rating
+        entry[1] += 1
+        self._pending_count += 1
+        if self._pending_count >= self.flush_size and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.ensure_future(self.flush())
+        return entry[1]
+
+    async def flush(self) -> None:
+        """Write all pending ratings, one increment per recipe."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_count = 0
+            for recipe_id, (rating_sum, rating_count, attempts) in pending.items():
+                try:
+                    await apply_rating(recipe_id, rating_sum, rating_count)
+                    self.flushed += rating_count
+                except Exception as e:
+                    self.failed_flushes += 1
+                    attempts += 1
+                    if (isinstance(e, RepositoryError) and e.permanent) or attempts >= self.max_attempts:
+                        logger.error(
+                            "Dropping ratings that could not be flushed",
+                            extra={"recipe_id": recipe_id, "ratings": rating_count, "attempts": attempts, "error": str(e)}
+                        )
+                        self.dropped += rating_count
+                        continue
+                    logger.warning(
+                        "Error flushing ratings",
+                        extra={"recipe_id": recipe_id, "ratings": rating_count, "attempts": attempts, "error": str(e)}
+                    )
+                    entry = self._pending.setdefault(recipe_id, [0.0, 0, 0])
+                    entry[0] += rating_sum
+                    entry[1] += rating_count
+                    entry[2] = max(entry[2], attempts)
+                    self._pending_count += rating_count
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flush_task is not None:
+            await asyncio.wait({self._flush_task})
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._pending_count,
+            "pending_recipes": len(self._pending),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+        }
+
+
+RATING_WRITE_BEHIND = os.getenv("RATING_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+
+rating_aggregator = RatingAggregator.from_env()
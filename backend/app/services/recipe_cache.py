@@ -0,0 +1,179 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def normalize_term(term: str) -> str:
+    """Lower-case a free-text term and collapse its whitespace."""
+    return " ".join(term.lower().split())
+
+
+def normalize_terms(terms: Optional[Iterable[str]]) -> List[str]:
+    """Normalize, deduplicate and sort a list of free-text terms."""
+    if not terms:
+        return []
+    return sorted({normalize_term(t) for t in terms if t and t.strip()})
+
+
+def canonical_request(
+    ingredients: List[str],
+    dietary_preferences: Optional[List[str]] = None,
+    cooking_time: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    servings: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Return the canonical form of a recipe generation request."""
+    return {
+        "ingredients": normalize_terms(ingredients),
+        "dietary_preferences": normalize_terms(dietary_preferences),
+        "cooking_time": cooking_time or None,
+        "difficulty": normalize_term(difficulty) if difficulty else None,
+        "servings": servings or None,
+    }
+
+
+def cache_key(canonical: Dict[str, Any]) -> str:
+    """Hash a canonical request into a compact cache key."""
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class RecipeCache:
+    """
+    LRU cache with a TTL and a memory cap for generated recipes.
+
+    ``get_or_create`` also coalesces concurrent misses for the same key, so
+    identical requests arriving together share a single generation.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires_at, size_in_bytes, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "RecipeCache":
+        return cls(
+            max_entries=int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RECIPE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl=float(os.getenv("RECIPE_CACHE_TTL", "3600")),
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        # Hand out copies so callers can't mutate the cached recipe
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict) -> None:
+        size = len(json.dumps(value, default=str))
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, copy.deepcopy(value))
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def lookup(self, key: str) -> Tuple[Optional[Dict], Optional[asyncio.Future]]:
+        """
+        Look up ``key`` and count the outcome. Returns the cached value on a
+        hit; otherwise the in-flight generation for the key, if any, to wait
+        for. ``(None, None)`` is a miss: the caller generates the value and
+        should register it with ``start`` so identical requests can join.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, None
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return None, inflight
+
+    def start(self, key: str, future: Optional[asyncio.Future] = None) -> asyncio.Future:
+        """
+        Register an in-flight generation for ``key``. Its result is cached
+        when it completes; a new future is created if none is given, for the
+        caller to resolve.
+        """
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._on_done(key, f))
+        return future
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Return the cached value for ``key``, generating it at most once."""
+        while True:
+            cached, task = self.lookup(key)
+            if cached is not None:
+                return cached
+            if task is None:
+                # Run the factory as its own task so a disconnecting caller
+                # doesn't cancel the generation other callers are waiting on.
+                task = self.start(key, asyncio.ensure_future(factory()))
+
+            # Unlike awaiting it, waiting leaves the task running if this
+            # caller is cancelled
+            await asyncio.wait({task})
+            # A joined generation may be a stream whose client went away;
+            # that doesn't cancel this caller, so look again
+            if not task.cancelled():
+                return copy.deepcopy(task.result())
+
+    def _on_done(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.set(key, task.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+recipe_cache = RecipeCache.from_env()
@@ -0,0 +1,209 @@
+import os
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from .recipe_cache import normalize_term, normalize_terms
+
+load_dotenv()
+
+# Build the index from the store in the background at startup
+RECIPE_INDEX_WARM = os.getenv("RECIPE_INDEX_WARM", "true").lower() in ("1", "true", "yes")
+# Minimum score for a stored recipe to be served instead of generating one
+RECIPE_MATCH_MIN_SCORE = float(os.getenv("RECIPE_MATCH_MIN_SCORE", "0.7"))
+
+# Ignored when judging how much of a recipe the requested ingredients cover
+PANTRY_STAPLES = frozenset({"salt", "pepper", "black pepper", "oil", "olive oil", "water", "sugar", "butter"})
+
+# Score weights: share of requested ingredients used, share of the recipe's
+# ingredients the user has, and rating
+COVERAGE_WEIGHT = 0.6
+USAGE_WEIGHT = 0.25
+RATING_WEIGHT = 0.15
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def ingredient_words(name: str) -> FrozenSet[str]:
+    """The normalized words of an ingredient name, e.g. ``"Red Bell Peppers"`` -> {red, bell, pepper}."""
+    return frozenset(_singular(w) for w in _WORD.findall(normalize_term(name)))
+
+
+_STAPLE_WORDS = frozenset(ingredient_words(s) for s in PANTRY_STAPLES)
+
+
+def _ingredient_name(ingredient: Any) -> str:
+    if isinstance(ingredient, dict):
+        return str(ingredient.get("name") or "")
+    return str(ingredient)
+
+
+def _total_time(cooking_time: Any) -> Optional[int]:
+    if isinstance(cooking_time, dict):
+        total = cooking_time.get("total_time")
+        if total is None and (cooking_time.get("prep_time") or cooking_time.get("cook_time")):
+            total = (cooking_time.get("prep_time") or 0) + (cooking_time.get("cook_time") or 0)
+        return total
+    return cooking_time if isinstance(cooking_time, int) else None
+
+
+class IndexedRecipe(NamedTuple):
+    """What the index keeps per recipe: enough to filter and score, not the recipe itself."""
+    id: str
+    ingredients: Tuple[FrozenSet[str], ...]
+    staples: Tuple[bool, ...]
+    difficulty: Optional[str]
+    total_time: Optional[int]
+    servings: Optional[int]
+    tags: FrozenSet[str]
+    rating: float
+
+
+class RecipeMatch(NamedTuple):
+    recipe_id: str
+    score: float
+    coverage: float
+
+
+class RecipeIndex:
+    """
+    In-process inverted index from ingredient words to saved recipes.
+
+    A requested ingredient matches a stored one when all of its words appear
+    in the stored name, so "chicken" matches "chicken thighs". Recipes are
+    scored by how many requested ingredients they use, how much of the recipe
+    those ingredients cover (ignoring pantry staples) and their rating.
+    """
+
+    def __init__(self):
+        self._recipes: Dict[str, IndexedRecipe] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._recipes
+
+    def add(self, recipe: Dict) -> None:
+        """Index (or re-index) a stored recipe row."""
+        if "id" not in recipe:
+            return
+        self.remove(recipe["id"])
+        names = [_ingredient_name(i) for i in recipe.get("ingredients") or []]
+        words = tuple(w for w in (ingredient_words(n) for n in names) if w)
+        difficulty = recipe.get("difficulty")
+        entry = IndexedRecipe(
+            id=recipe["id"],
+            ingredients=words,
+            staples=tuple(w in _STAPLE_WORDS for w in words),
+            difficulty=normalize_term(difficulty) if difficulty else None,
+            total_time=_total_time(recipe.get("cooking_time")),
+            servings=recipe.get("servings"),
+            tags=frozenset(normalize_terms(recipe.get("tags") or [])),
+            rating=float(recipe.get("rating") or 0),
+        )
+        self._recipes[entry.id] = entry
+        for word in set().union(*words) if words else ():
+            self._postings.setdefault(word, set()).add(entry.id)
+
+    def add_many(self, recipes: Iterable[Dict]) -> None:
+        for recipe in recipes:
+            self.add(recipe)
+
+    def remove(self, recipe_id: str) -> None:
+        entry = self._recipes.pop(recipe_id, None)
+        if entry is None:
+            return
+        for word in set().union(*entry.ingredients) if entry.ingredients else ():
+            ids = self._postings.get(word)
+            if ids is not None:
+                ids.discard(recipe_id)
+                if not ids:
+                    del self._postings[word]
+
+    def update_rating(self, recipe_id: str, rating: float) -> None:
+        entry = self._recipes.get(recipe_id)
+        if entry is not None:
+            self._recipes[recipe_id] = entry._replace(rating=float(rating or 0))
+
+    def match(
+        self,
+        ingredients: List[str],
+        dietary_preferences: Optional[List[str]] = None,
+        cooking_time: Optional[int] = None,
+        difficulty: Optional[str] = None,
+        servings: Optional[int] = None,
+        min_score: float = RECIPE_MATCH_MIN_SCORE,
+        limit: int = 5,
+    ) -> List[RecipeMatch]:
+        """
+        Return up to ``limit`` recipes scoring at least ``min_score``, best first.
+
+        ``cooking_time`` is a maximum total time; ``difficulty`` and
+        ``servings`` must match exactly, and every dietary preference must be
+        one of the recipe's tags.
+        """
+        requested = [w for w in dict.fromkeys(ingredient_words(i) for i in ingredients) if w]
+        if not requested:
+            return []
+        difficulty = normalize_term(difficulty) if difficulty else None
+        preferences = set(normalize_terms(dietary_preferences))
+
+        # Candidates contain every word of at least one requested ingredient
+        candidates: Set[str] = set()
+        for words in requested:
+            postings = sorted((self._postings.get(w, set()) for w in words), key=len)
+            candidates |= set.intersection(*postings)
+
+        matches = []
+        for recipe_id in candidates:
+            entry = self._recipes[recipe_id]
+            if difficulty and entry.difficulty != difficulty:
+                continue
+            if cooking_time and (entry.total_time is None or entry.total_time > cooking_time):
+                continue
+            if servings and entry.servings != servings:
+                continue
+            if preferences and not preferences <= entry.tags:
+                continue
+
+            used = [False] * len(entry.ingredients)
+            found = 0
+            for words in requested:
+                hit = False
+                for i, stored in enumerate(entry.ingredients):
+                    if words <= stored:
+                        used[i] = hit = True
+                if hit:
+                    found += 1
+            coverage = found / len(requested)
+            needed = [u for u, staple in zip(used, entry.staples) if not staple]
+            usage = sum(needed) / len(needed) if needed else 1.0
+            score = (
+                COVERAGE_WEIGHT * coverage
+                + USAGE_WEIGHT * usage
+                + RATING_WEIGHT * min(entry.rating, 5) / 5
+            )
+            if score >= min_score:
+                matches.append(RecipeMatch(recipe_id, round(score, 4), round(coverage, 4)))
+
+        matches.sort(key=lambda m: (-m.score, m.recipe_id))
+        return matches[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {"recipes": len(self._recipes), "terms": len(self._postings)}
+
+
+recipe_index = RecipeIndex()
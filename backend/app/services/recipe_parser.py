@@ -0,0 +1,192 @@
+import json
+import re
+from typing import Dict, List
+
+from pydantic import ValidationError
+
+from app.models.recipe import GeneratedRecipe
+from app.services.metrics import PARSE_RESULTS
+
+REQUIRED_FIELDS = ["title", "ingredients", "instructions", "cooking_time", "difficulty", "servings"]
+
+# Bare words the model sometimes emits in place of JSON literals
+_LITERALS = {
+    "true": "true", "True": "true",
+    "false": "false", "False": "false",
+    "null": "null", "None": "null", "undefined": "null",
+}
+
+_CLOSERS = {"{": "}", "[": "]"}
+_NUMBER_START = frozenset("-0123456789")
+_SINGLE_QUOTE_END = frozenset(",:}]")
+_CONTROL_ESCAPES = str.maketrans({"\n": "\\n", "\r": "\\r", "\t": "\\t"})
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+# One token per match; the group that matched identifies its kind
+_TOKEN = re.compile(r"""\s*(?:
+    ("(?:[^"\\]|\\.)*")   # 1: double-quoted string
+  | ([{\[])                # 2: open
+  | ([}\]])                # 3: close
+  | (,)                    # 4: comma
+  | (:)                    # 5: colon
+  | (-?\d[\d.eE+-]*)       # 6: number
+  | ([A-Za-z_]\w*)         # 7: bare word
+  | (')                    # 8: single-quoted string
+  | (")                    # 9: unterminated string
+  | (.)                    # 10: anything else
+)""", re.VERBOSE | re.DOTALL)
+_STRING, _OPEN, _CLOSE, _COMMA, _COLON, _NUMBER, _WORD, _SINGLE_QUOTE, _UNTERMINATED, _OTHER = range(1, 11)
+
+
+def repair_json(text: str) -> str:
+    """
+    Extract the first balanced top-level JSON object from an LLM response and
+    repair common defects in a single left-to-right pass.
+
+    Handles surrounding prose and markdown fences, trailing commas,
+    single-quoted strings (apostrophes inside double-quoted strings are left
+    alone), Python literals (``True``/``False``/``None``), unquoted words and
+    truncation, e.g. when the response hit ``max_output_tokens``.
+    Returns compact JSON text.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No valid JSON object found in the response")
+
+    out: List[str] = []
+    stack: List[str] = []
+    pending_comma = False
+    i, n = start, len(text)
+
+    while i < n:
+        match = _TOKEN.match(text, i)
+        if match is None:
+            # Only whitespace left
+            break
+        kind = match.lastindex
+        token = match.group(kind)
+        i = match.end()
+
+        if kind == _COMMA:
+            pending_comma = True
+            continue
+
+        if kind == _CLOSE:
+            # A pending comma here is a trailing comma: drop it
+            pending_comma = False
+            if stack:
+                out.append(_CLOSERS[stack.pop()])
+            if not stack:
+                break
+            continue
+
+        if kind == _OTHER:
+            # Stray characters (backticks, semicolons, ...) are dropped
+            continue
+
+        if pending_comma:
+            out.append(",")
+            pending_comma = False
+
+        if kind == _OPEN:
+            stack.append(token)
+            out.append(token)
+        elif kind == _STRING:
+            if "\n" in token or "\t" in token or "\r" in token:
+                # Raw control characters are invalid inside JSON strings
+                token = token.translate(_CONTROL_ESCAPES)
+            out.append(token)
+        elif kind == _WORD:
+            out.append(_LITERALS.get(token) or json.dumps(token))
+        elif kind == _SINGLE_QUOTE:
+            # Only a quote followed by a delimiter closes the string, so
+            # apostrophes inside it ("chef's knife") survive.
+            j = i
+            while True:
+                j = text.find("'", j)
+                if j < 0:
+                    j = n
+                    break
+                if text[j - 1] == "\\":
+                    j += 1
+                    continue
+                k = _WHITESPACE.match(text, j + 1).end()
+                if k >= n or text[k] in _SINGLE_QUOTE_END:
+                    break
+                j += 1
+            content = text[i:j].replace("\\'", "'").replace('"', '\\"')
+            out.append('"' + content.translate(_CONTROL_ESCAPES) + '"')
+            i = j + 1
+        elif kind == _UNTERMINATED:
+            # Truncated inside a string
+            token = text[match.start(kind):].rstrip("\\") + '"'
+            out.append(token.translate(_CONTROL_ESCAPES))
+            i = n
+        else:
+            # Colon or number
+            out.append(token)
+
+    if stack:
+        _close_truncated(out, stack)
+
+    return "".join(out)
+
+
+def _close_truncated(out: List[str], stack: List[str]) -> None:
+    """Drop a dangling partial token and close every open container."""
+    if out and out[-1][0] in _NUMBER_START and out[-1][-1] in ".eE+-":
+        # Cut off mid-number, e.g. "1." or "2e"
+        out[-1] = out[-1].rstrip(".eE+-") or "null"
+    if out and out[-1] == ":":
+        # Key without a value
+        out.pop()
+        out.pop()
+    elif stack[-1] == "{" and len(out) > 1 and out[-1].startswith('"') and out[-2] in ("{", ","):
+        # Key without a colon
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+    while stack:
+        out.append(_CLOSERS[stack.pop()])
+
+
+def parse_recipe(text: str) -> Dict:
+    """
+    Parse and validate a raw recipe response from the model.
+
+    Raises ``ValueError`` if no object can be recovered or the recipe is
+    missing required fields or has the wrong shape.
+    """
+    # Fast path: a well-formed object, possibly wrapped in fences or prose,
+    # is decoded in place by the C decoder without copying the text.
+    recipe_data = None
+    start = text.find("{")
+    if start >= 0:
+        try:
+            recipe_data, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            recipe_data = None
+    repaired = not isinstance(recipe_data, dict)
+    if repaired:
+        try:
+            recipe_data = json.loads(repair_json(text))
+        except ValueError as e:
+            PARSE_RESULTS.inc("failed")
+            raise ValueError(f"Failed to parse AI response as JSON: {str(e)}")
+        if not isinstance(recipe_data, dict):
+            PARSE_RESULTS.inc("failed")
+            raise ValueError("No valid JSON object found in the response")
+
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in recipe_data]
+    if missing_fields:
+        PARSE_RESULTS.inc("invalid")
+        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+
+    try:
+        recipe = GeneratedRecipe.model_validate(recipe_data)
+    except ValidationError as e:
+        PARSE_RESULTS.inc("invalid")
+        raise ValueError(f"Invalid recipe in AI response: {e.errors()[0]['loc']}: {e.errors()[0]['msg']}")
+    PARSE_RESULTS.inc("repaired" if repaired else "clean")
+    return recipe.model_dump()
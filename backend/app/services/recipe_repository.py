@@ -0,0 +1,327 @@
+import copy
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# (sort value, id) of the last row of the previous page
+Keyset = Tuple[Any, str]
+
+
+class RepositoryError(Exception):
+    """A request to the store failed; ``status_code`` is the HTTP status, if any."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def permanent(self) -> bool:
+        """Whether retrying the same request can't succeed (a 4xx other than timeouts and rate limits)."""
+        return self.status_code is not None and 400 <= self.status_code < 500 and self.status_code not in (408, 429)
+
+
+class RecipeRepository(ABC):
+    """Storage interface for recipes. All methods are non-blocking."""
+
+    @abstractmethod
+    async def insert(self, recipe: Dict) -> Dict:
+        """Insert one recipe and return the stored row."""
+
+    @abstractmethod
+    async def bulk_insert(self, recipes: List[Dict]) -> List[Dict]:
+        """Insert several recipes in one round trip and return the stored rows."""
+
+    @abstractmethod
+    async def list(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Keyset] = None,
+        columns: Optional[List[str]] = None,
+        difficulty: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+    ) -> List[Dict]:
+        """Return up to ``limit`` of a user's recipes ordered by ``(sort, id)``, starting after ``after``."""
+
+    @abstractmethod
+    async def scan(self, limit: int, after: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict]:
+        """Return up to ``limit`` recipes of all users ordered by id, starting after id ``after``."""
+
+    @abstractmethod
+    async def get(self, recipe_id: str) -> Optional[Dict]:
+        """Return a recipe by id, or ``None``."""
+
+    @abstractmethod
+    async def get_many(self, recipe_ids: List[str], columns: Optional[List[str]] = None) -> List[Dict]:
+        """Return the recipes with these ids in one round trip, in no particular order; missing ids are skipped."""
+
+    @abstractmethod
+    async def rate(self, recipe_id: str, rating_sum: float, rating_count: int) -> Optional[Dict]:
+        """Atomically fold ratings into a recipe's average; ``None`` if it doesn't exist."""
+
+    async def ping(self) -> None:
+        """Raise if the store can't be reached."""
+
+    async def close(self) -> None:
+        """Release any connections held by the repository."""
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logical filter."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SupabaseRecipeRepository(RecipeRepository):
+    """
+    Recipes stored in Supabase, accessed through its PostgREST API with a
+    shared async HTTP client (keep-alive, bounded connection pool).
+    """
+
+    def __init__(self, url: str, key: str, pool_size: int = 20, timeout: float = 10.0):
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.key = key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "SupabaseRecipeRepository":
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
+        return cls(
+            url,
+            key,
+            pool_size=int(os.getenv("SUPABASE_POOL_SIZE", "20")),
+            timeout=float(os.getenv("SUPABASE_TIMEOUT", "10")),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self.key,
+                    "Authorization": f"Bearer {self.key}",
+                    "Prefer": "return=representation",
+                },
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        response = await self.client.request(method, path, **kwargs)
+        if response.is_error:
+            raise RepositoryError(
+                f"Supabase request failed ({response.status_code}): {response.text}",
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    async def insert(self, recipe: Dict) -> Dict:
+        rows = await self._request("POST", "/recipes", json=recipe)
+        return rows[0]
+
+    async def bulk_insert(self, recipes: List[Dict]) -> List[Dict]:
+        if not recipes:
+            return []
+        # PostgREST takes the keys of a bulk insert from ``columns`` (or the
+        # first object); with missing=default, keys a row lacks get the
+        # column default instead of NULL
+        columns = list(dict.fromkeys(key for recipe in recipes for key in recipe))
+        return await self._request(
+            "POST",
+            "/recipes",
+            json=recipes,
+            params={"columns": ",".join(columns)},
+            headers={"Prefer": "return=representation,missing=default"},
+        )
+
+    async def list(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Keyset] = None,
+        columns: Optional[List[str]] = None,
+        difficulty: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+    ) -> List[Dict]:
+        direction = "desc" if descending else "asc"
+        params = [
+            ("select", ",".join(columns) if columns else "*"),
+            ("user_id", f"eq.{user_id}"),
+        ]
+        if difficulty:
+            params.append(("difficulty", f"eq.{difficulty}"))
+        if min_rating is not None:
+            params.append(("rating", f"gte.{min_rating}"))
+        if after is not None:
+            sort_value, last_id = after
+            op = "lt" if descending else "gt"
+            params.append((
+                "or",
+                f"({sort}.{op}.{_quote(sort_value)},"
+                f"and({sort}.eq.{_quote(sort_value)},id.{op}.{_quote(last_id)}))",
+            ))
+        params.append(("order", f"{sort}.{direction},id.{direction}"))
+        params.append(("limit", str(limit)))
+        return await self._request("GET", "/recipes", params=params)
+
+    async def scan(self, limit: int, after: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict]:
+        params = [("select", ",".join(columns) if columns else "*")]
+        if after is not None:
+            params.append(("id", f"gt.{after}"))
+        params.append(("order", "id.asc"))
+        params.append(("limit", str(limit)))
+        return await self._request("GET", "/recipes", params=params)
+
+    async def get(self, recipe_id: str) -> Optional[Dict]:
+        rows = await self._request(
+            "GET", "/recipes", params={"select": "*", "id": f"eq.{recipe_id}", "limit": "1"}
+        )
+        return rows[0] if rows else None
+
+    async def get_many(self, recipe_ids: List[str], columns: Optional[List[str]] = None) -> List[Dict]:
+        if not recipe_ids:
+            return []
+        return await self._request("GET", "/recipes", params={
+            "select": ",".join(columns) if columns else "*",
+            "id": f"in.({','.join(_quote(i) for i in recipe_ids)})",
+        })
+
+    async def rate(self, recipe_id: str, rating_sum: float, rating_count: int) -> Optional[Dict]:
+        rows = await self._request("POST", "/rpc/increment_recipe_rating", json={
+            "p_recipe_id": recipe_id,
+            "p_sum": rating_sum,
+            "p_count": rating_count,
+        })
+        return rows[0] if rows else None
+
+    async def ping(self) -> None:
+        await self._request("GET", "/recipes", params={"select": "id", "limit": "1"})
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class InMemoryRecipeRepository(RecipeRepository):
+    """
+    Process-local stand-in for Supabase with the same behaviour, for running
+    the API offline and for load tests. Data is lost on restart.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, Dict] = {}
+
+    def _store(self, recipe: Dict) -> Dict:
+        now = datetime.now(timezone.utc).isoformat()
+        row = {"rating": 0, "total_ratings": 0, **copy.deepcopy(recipe)}
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", now)
+        row.setdefault("updated_at", now)
+        self._rows[row["id"]] = row
+        return copy.deepcopy(row)
+
+    async def insert(self, recipe: Dict) -> Dict:
+        return self._store(recipe)
+
+    async def bulk_insert(self, recipes: List[Dict]) -> List[Dict]:
+        return [self._store(recipe) for recipe in recipes]
+
+    async def list(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Keyset] = None,
+        columns: Optional[List[str]] = None,
+        difficulty: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+    ) -> List[Dict]:
+        rows = [
+            row for row in self._rows.values()
+            if row["user_id"] == user_id
+            and (not difficulty or row.get("difficulty") == difficulty)
+            and (min_rating is None or row.get("rating", 0) >= min_rating)
+        ]
+        if after is not None:
+            if descending:
+                rows = [row for row in rows if (row[sort], row["id"]) < tuple(after)]
+            else:
+                rows = [row for row in rows if (row[sort], row["id"]) > tuple(after)]
+        rows.sort(key=lambda row: (row[sort], row["id"]), reverse=descending)
+        rows = rows[:limit]
+        if columns:
+            return [{c: copy.deepcopy(row[c]) for c in columns if c in row} for row in rows]
+        return copy.deepcopy(rows)
+
+    async def scan(self, limit: int, after: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict]:
+        ids = sorted(i for i in self._rows if after is None or i > after)[:limit]
+        if columns:
+            return [{c: copy.deepcopy(self._rows[i][c]) for c in columns if c in self._rows[i]} for i in ids]
+        return [copy.deepcopy(self._rows[i]) for i in ids]
+
+    async def get(self, recipe_id: str) -> Optional[Dict]:
+        row = self._rows.get(recipe_id)
+        return copy.deepcopy(row) if row is not None else None
+
+    async def get_many(self, recipe_ids: List[str], columns: Optional[List[str]] = None) -> List[Dict]:
+        rows = [self._rows[i] for i in dict.fromkeys(recipe_ids) if i in self._rows]
+        if columns:
+            return [{c: copy.deepcopy(row[c]) for c in columns if c in row} for row in rows]
+        return copy.deepcopy(rows)
+
+    async def rate(self, recipe_id: str, rating_sum: float, rating_count: int) -> Optional[Dict]:
+        row = self._rows.get(recipe_id)
+        if row is None:
+            return None
+        total = row["rating"] * row["total_ratings"] + rating_sum
+        row["total_ratings"] += rating_count
+        row["rating"] = total / row["total_ratings"]
+        row["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return copy.deepcopy(row)
+
+
+RECIPE_STORE = os.getenv("RECIPE_STORE", "supabase").lower()
+
+_repository: Optional[RecipeRepository] = None
+
+
+def get_recipe_repository() -> RecipeRepository:
+    """Return the process-wide repository selected by ``RECIPE_STORE``."""
+    global _repository
+    if _repository is None:
+        if RECIPE_STORE == "memory":
+            _repository = InMemoryRecipeRepository()
+        elif RECIPE_STORE == "supabase":
+            _repository = SupabaseRecipeRepository.from_env()
+        else:
+            raise ValueError(f"Unknown RECIPE_STORE: {RECIPE_STORE}")
+    return _repository
+
+
+async def close_recipe_repository() -> None:
+    global _repository
+    if _repository is not None:
+        await _repository.close()
+        _repository = None
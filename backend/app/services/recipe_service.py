@@ -1,20 +1,50 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
-from .supabase_client import supabase
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
+import base64
+import copy
 import json
+import uuid
+from pydantic import ValidationError
+from app.models.recipe import GeneratedRecipe, RecipeCreate
+from .generation_engine import EngineError
+from .llm import response_schema
+from .llm_client import llm_client
+from .logger import get_logger, sample_payload, truncate
+from .metrics import RECIPE_MATCHES, stage
+from .recipe_cache import recipe_cache, canonical_request, cache_key
+from .recipe_stream import IncrementalRecipeParser, recipe_events
+from .recipe_parser import parse_recipe
+from .recipe_index import recipe_index
+from .recipe_repository import get_recipe_repository
+from .rating_service import apply_rating, rating_aggregator, RATING_WRITE_BEHIND
 
 load_dotenv()
 
-# Configure Google AI
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY environment variable is not set")
+logger = get_logger("recipe_service")
 
-print("Configuring Google AI with API key...")
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel('gemini-1.5-flash')  # Using Gemini 1.5 Flash
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+# Ask Gemini for JSON constrained by the recipe schema instead of free text
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+# Upper bound for the per-request output token budget
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "2048"))
+
+DEFAULT_PAGE_SIZE = 50
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Longest NDJSON line accepted by an import, and most errors reported back
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+IMPORT_MAX_ERRORS = 100
+RECIPE_COLUMNS = {
+    "id", "title", "description", "ingredients", "instructions", "cooking_time",
+    "difficulty", "servings", "user_id", "rating", "total_ratings",
+    "created_at", "updated_at", "nutritional_info", "tags", "tips",
+}
+SORT_COLUMNS = {"created_at", "rating"}
+# Returned by match_recipes: saved recipes are shared across users, so who
+# saved them stays out
+MATCH_COLUMNS = sorted(RECIPE_COLUMNS - {"user_id"})
 
 async def generate_recipe(
     ingredients: List[str],
@@ -24,122 +54,287 @@ async def generate_recipe(
     servings: Optional[int] = None
 ) -> Dict:
     """
-    Generate a recipe based on provided ingredients and preferences using Gemini AI.
+    Generate a recipe, reusing a cached result for equivalent requests.
+
+    Requests are canonicalized first (ingredients and preferences normalized,
+    deduplicated and sorted), so ingredient order and casing don't matter.
+    Concurrent identical requests share a single Gemini call.
     """
-    print(f"Generating recipe with ingredients: {ingredients}")
-    print(f"Dietary preferences: {dietary_preferences}")
-    print(f"Cooking time: {cooking_time}")
-    print(f"Difficulty: {difficulty}")
-    print(f"Servings: {servings}")
+    canonical = canonical_request(
+        ingredients, dietary_preferences, cooking_time, difficulty, servings
+    )
 
-    # Build the prompt with all available information
-    prompt_parts = [
-        f"Create a recipe using these ingredients: {', '.join(ingredients)}"
-    ]
-    
+    async def generate() -> Dict:
+        return await _generate_recipe_uncached(**canonical)
+
+    return await recipe_cache.get_or_create(cache_key(canonical), generate)
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS,
+}
+
+# Step limits by difficulty; they bound the longest part of the output
+MAX_STEPS = {"easy": 6, "medium": 8, "hard": 12}
+DEFAULT_MAX_STEPS = 8
+
+# The response schema is derived from the recipe model once, with one
+# variant per step limit, and passed to Gemini so it returns bare JSON.
+RECIPE_SCHEMA = response_schema(GeneratedRecipe)
+
+def _schema_with_max_steps(steps: int) -> Dict:
+    schema = copy.deepcopy(RECIPE_SCHEMA)
+    schema["properties"]["instructions"]["max_items"] = steps
+    return schema
+
+RECIPE_SCHEMAS = {steps: _schema_with_max_steps(steps) for steps in {DEFAULT_MAX_STEPS, *MAX_STEPS.values()}}
+
+def _schema_shape(node: Dict) -> str:
+    """A compact, one-line rendering of a response schema for the prompt."""
+    if node["type"] == "object":
+        fields = ",".join(f'"{k}":{_schema_shape(v)}' for k, v in node["properties"].items())
+        return "{" + fields + "}"
+    if node["type"] == "array":
+        return "[" + _schema_shape(node["items"]) + ",...]"
+    return {"string": "str", "integer": "int", "number": "num", "boolean": "bool"}[node["type"]]
+
+RECIPE_SHAPE = _schema_shape(RECIPE_SCHEMA)
+
+PROMPT_TEMPLATE = (
+    "Create a recipe using these ingredients: {ingredients}\n"
+    "{constraints}"
+    "Use at most {steps} short steps and a one-sentence description."
+)
+SHAPE_INSTRUCTION = "\nReply with only a JSON object shaped like " + RECIPE_SHAPE
+
+def _max_steps(difficulty: Optional[str]) -> int:
+    return MAX_STEPS.get(difficulty.strip().lower() if difficulty else "", DEFAULT_MAX_STEPS)
+
+def build_prompt(
+    ingredients: List[str],
+    dietary_preferences: Optional[List[str]] = None,
+    cooking_time: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    servings: Optional[int] = None,
+    shape: bool = True
+) -> str:
+    """
+    Build the Gemini prompt with all available information. ``shape`` adds
+    the expected JSON layout, which isn't needed when a response schema is sent.
+    """
+    constraints = ""
     if dietary_preferences:
-        prompt_parts.append(f"Dietary preferences: {', '.join(dietary_preferences)}")
+        constraints += f"Dietary preferences: {', '.join(dietary_preferences)}\n"
     if cooking_time:
-        prompt_parts.append(f"Maximum cooking time: {cooking_time} minutes")
+        constraints += f"Maximum total time: {cooking_time} minutes\n"
     if difficulty:
-        prompt_parts.append(f"Difficulty level: {difficulty}")
+        constraints += f"Difficulty: {difficulty}\n"
     if servings:
-        prompt_parts.append(f"Number of servings: {servings}")
-
-    prompt_parts.append("""
-    Return a JSON object with the following structure. Make sure to use proper JSON formatting with double quotes for all keys and string values:
-    {
-        "title": "Recipe name",
-        "description": "Brief description of the recipe",
-        "ingredients": [
-            {
-                "name": "ingredient name",
-                "amount": "quantity",
-                "unit": "unit of measurement"
-            }
-        ],
-        "instructions": [
-            "Step 1 description",
-            "Step 2 description"
-        ],
-        "cooking_time": {
-            "prep_time": 10,
-            "cook_time": 20,
-            "total_time": 30
-        },
-        "difficulty": "easy",
-        "servings": 4
-    }
-    IMPORTANT: Return ONLY the JSON object, no additional text or markdown formatting.
-    """)
+        constraints += f"Servings: {servings}\n"
+    prompt = PROMPT_TEMPLATE.format(
+        ingredients=", ".join(ingredients),
+        constraints=constraints,
+        steps=_max_steps(difficulty),
+    )
+    return prompt + SHAPE_INSTRUCTION if shape else prompt
 
-    prompt = "\n".join(prompt_parts)
-    print(f"Generated prompt: {prompt}")
-    
-    try:
-        print("Calling Gemini API...")
-        # Configure generation parameters for better results
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.8,
-            "top_k": 40,
-            "max_output_tokens": 2048,
+def output_token_budget(ingredients: List[str], difficulty: Optional[str] = None) -> int:
+    """
+    Size ``max_output_tokens`` from the request: a fixed part for the title,
+    description and times, one ingredient entry per requested ingredient
+    plus a few the model usually adds, and one sentence per allowed step,
+    with 50% headroom. Servings change quantities, not length, so they
+    don't count.
+    """
+    estimate = 150 + 25 * (len(ingredients) + 4) + 40 * _max_steps(difficulty)
+    return min(GEMINI_MAX_OUTPUT_TOKENS, int(estimate * 1.5))
+
+def generation_config(
+    ingredients: List[str],
+    difficulty: Optional[str] = None,
+    schema: bool = True
+) -> Dict:
+    """
+    Generation settings for one request. With ``GEMINI_STRUCTURED_OUTPUT``
+    Gemini is asked for JSON, constrained by the recipe schema when
+    ``schema`` is set.
+    """
+    config = {**GENERATION_CONFIG, "max_output_tokens": output_token_budget(ingredients, difficulty)}
+    if GEMINI_STRUCTURED_OUTPUT:
+        config["response_mime_type"] = "application/json"
+        if schema:
+            config["response_schema"] = RECIPE_SCHEMAS[_max_steps(difficulty)]
+    return config
+
+async def _generate_recipe_uncached(
+    ingredients: List[str],
+    dietary_preferences: Optional[List[str]] = None,
+    cooking_time: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    servings: Optional[int] = None
+) -> Dict:
+    """
+    Generate a recipe based on provided ingredients and preferences using Gemini AI.
+    """
+    logger.info(
+        "Generating recipe",
+        extra={
+            "ingredients": len(ingredients),
+            "dietary_preferences": dietary_preferences,
+            "cooking_time": cooking_time,
+            "difficulty": difficulty,
+            "servings": servings,
         }
-        
-        response = model.generate_content(
-            prompt,
-            generation_config=generation_config
+    )
+    # Full prompt/response bodies are only logged for a sample of requests
+    log_payload = sample_payload()
+
+    with stage("prompt"):
+        prompt = build_prompt(
+            ingredients, dietary_preferences, cooking_time, difficulty, servings,
+            shape=not GEMINI_STRUCTURED_OUTPUT
         )
-        print("Received response from Gemini API")
-        recipe_json = response.text
-        print(f"Raw AI response: {recipe_json}")
-        
-        # Clean up the response to ensure it's valid JSON
-        recipe_json = recipe_json.replace("```json", "").replace("```", "").strip()
-        
-        # Try to find the JSON object in the response
-        start_idx = recipe_json.find("{")
-        end_idx = recipe_json.rfind("}") + 1
-        if start_idx >= 0 and end_idx > start_idx:
-            recipe_json = recipe_json[start_idx:end_idx]
-        else:
-            raise ValueError("No valid JSON object found in the response")
-        
-        print(f"Cleaned JSON: {recipe_json}")
-        
-        # Parse the JSON response
-        try:
-            recipe_data = json.loads(recipe_json)
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {str(e)}")
-            print(f"Raw AI response: {recipe_json}")
-            # Try to fix common JSON formatting issues
-            recipe_json = recipe_json.replace("'", '"')  # Replace single quotes with double quotes
-            recipe_json = recipe_json.replace("None", "null")  # Replace Python None with JSON null
-            try:
-                recipe_data = json.loads(recipe_json)
-            except json.JSONDecodeError as e2:
-                raise ValueError(f"Failed to parse AI response as JSON: {str(e2)}\nRaw response: {recipe_json}")
-        
-        print(f"Parsed recipe data: {recipe_data}")
-        
-        # Validate required fields
-        required_fields = ["title", "ingredients", "instructions", "cooking_time", "difficulty", "servings"]
-        missing_fields = [field for field in required_fields if field not in recipe_data]
-        if missing_fields:
-            raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+        config = generation_config(ingredients, difficulty)
+    if log_payload:
+        logger.info("Gemini prompt", extra={"prompt": truncate(prompt)})
+    
+    def parse(recipe_json: str) -> Dict:
+        logger.debug("Received response from Gemini API", extra={"response_chars": len(recipe_json)})
+        if log_payload:
+            logger.info("Gemini response", extra={"response": truncate(recipe_json)})
+        # Extract, repair and validate the JSON object in a single pass
+        return parse_recipe(recipe_json)
+
+    try:
+        # Deadline, hedging, retries (including unparseable responses) and
+        # the fallback model are handled by the LLM client
+        recipe_data = await llm_client.generate(prompt, config, parse)
+        logger.info("Generated recipe", extra={"title": truncate(recipe_data["title"], 200)})
         
         return recipe_data
         
+    except EngineError as e:
+        logger.warning("Generation engine error", extra={"error": str(e), "error_type": type(e).__name__})
+        raise
     except ValueError as e:
-        print(f"Value error in generate_recipe: {str(e)}")
+        logger.warning("Invalid recipe response", extra={"error": truncate(str(e))})
         raise ValueError(str(e))
     except Exception as e:
-        print(f"Error in generate_recipe: {str(e)}")
+        logger.error("Error generating recipe", extra={"error": truncate(str(e))}, exc_info=True)
         raise Exception(f"Error generating recipe: {str(e)}")
 
-async def save_recipe(recipe_data: Dict, user_id: str) -> Dict:
-    """Save a recipe to Supabase."""
+async def stream_recipe(
+    ingredients: List[str],
+    dietary_preferences: Optional[List[str]] = None,
+    cooking_time: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    servings: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Generate a recipe with Gemini's streaming mode, yielding ``(event, data)``
+    pairs as soon as each part of the recipe is complete.
+
+    Emits ``field`` events for top-level fields (title and description first),
+    one ``ingredient`` / ``instruction`` event per list item, and a final
+    ``done`` event carrying the validated recipe.
+    """
+    canonical = canonical_request(
+        ingredients, dietary_preferences, cooking_time, difficulty, servings
+    )
+    key = cache_key(canonical)
+
+    while True:
+        cached, inflight = recipe_cache.lookup(key)
+        if inflight is None:
+            break
+        # An identical request is generating: replay its result once done.
+        # If it was abandoned (its client went away), look again.
+        await asyncio.wait({inflight})
+        if not inflight.cancelled():
+            cached = copy.deepcopy(inflight.result())
+            break
+    if cached is not None:
+        for event in recipe_events(cached):
+            yield event
+        yield "done", cached
+        return
+
+    # No response schema here: Gemini orders schema fields itself, while the
+    # shape in the prompt puts the title and description first.
+    prompt = build_prompt(**canonical)
+    config = generation_config(canonical["ingredients"], canonical["difficulty"], schema=False)
+    logger.info("Streaming recipe", extra={"ingredients": len(canonical["ingredients"])})
+
+    # Identical requests arriving meanwhile wait for this one; the result is
+    # cached when ``pending`` is resolved
+    pending = recipe_cache.start(key)
+    parser = IncrementalRecipeParser()
+    chunks = llm_client.stream(prompt, config)
+    try:
+        try:
+            async for chunk in chunks:
+                for event in parser.feed(chunk.text):
+                    yield event
+                if parser.done:
+                    break
+        finally:
+            await chunks.aclose()
+
+        # A stream cut short (e.g. by max_output_tokens) is repaired by the parser
+        with stage("parse"):
+            recipe_data = parse_recipe(parser.text if parser.done else parser.raw)
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    except BaseException:
+        pending.cancel()
+        raise
+    pending.set_result(recipe_data)
+    yield "done", recipe_data
+
+async def generate_recipe_batch(
+    requests: List[Dict[str, Any]],
+    max_concurrency: int = BATCH_MAX_CONCURRENCY
+) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[Exception]]]:
+    """
+    Generate several recipes concurrently, yielding ``(index, recipe, error)``
+    for every request as soon as it completes.
+
+    Equivalent requests within the batch are generated once and their result
+    is yielded for each of their indices. A failing item only reports its own
+    error; the rest of the batch carries on.
+    """
+    groups: Dict[str, List[int]] = {}
+    canonicals: Dict[str, Dict] = {}
+    for index, request in enumerate(requests):
+        canonical = canonical_request(**request)
+        key = cache_key(canonical)
+        groups.setdefault(key, []).append(index)
+        canonicals[key] = canonical
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(key: str) -> Tuple[str, Optional[Dict], Optional[Exception]]:
+        async with semaphore:
+            try:
+                return key, await generate_recipe(**canonicals[key]), None
+            except Exception as e:
+                return key, None, e
+
+    tasks = [asyncio.ensure_future(run(key)) for key in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, recipe, error = await next_done
+            for index in groups[key]:
+                yield index, recipe, error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _recipe_row(recipe_data: Dict, user_id: str) -> Dict:
+    """Build the row to store for a generated recipe."""
     recipe = {
         "title": recipe_data["title"],
         "description": recipe_data.get("description", ""),
@@ -160,30 +355,258 @@ async def save_recipe(recipe_data: Dict, user_id: str) -> Dict:
         recipe["tags"] = recipe_data["tags"]
     if "tips" in recipe_data:
         recipe["tips"] = recipe_data["tips"]
-    
-    result = supabase.table("recipes").insert(recipe).execute()
-    return result.data[0]
-
-async def get_user_recipes(user_id: str) -> List[Dict]:
-    """Get all recipes for a specific user."""
-    result = supabase.table("recipes").select("*").eq("user_id", user_id).execute()
-    return result.data
-
-async def rate_recipe(recipe_id: str, rating: float) -> Dict:
-    """Update recipe rating."""
-    # First get current recipe data
-    recipe = supabase.table("recipes").select("*").eq("id", recipe_id).execute().data[0]
-    
-    # Calculate new average rating
-    current_total = recipe["rating"] * recipe["total_ratings"]
-    new_total = current_total + rating
-    new_count = recipe["total_ratings"] + 1
-    new_rating = new_total / new_count
-    
-    # Update recipe
-    result = supabase.table("recipes").update({
-        "rating": new_rating,
-        "total_ratings": new_count
-    }).eq("id", recipe_id).execute()
-    
-    return result.data[0] 
\ No newline at end of file
+    return recipe
+
+async def save_recipe(recipe_data: Dict, user_id: str) -> Dict:
+    """Save a recipe."""
+    with stage("db_insert"):
+        saved = await get_recipe_repository().insert(_recipe_row(recipe_data, user_id))
+    recipe_index.add(saved)
+    return saved
+
+async def save_recipes(recipes_data: List[Dict], user_id: str) -> List[Dict]:
+    """Save several recipes in a single round trip."""
+    rows = [_recipe_row(recipe_data, user_id) for recipe_data in recipes_data]
+    with stage("db_bulk_insert"):
+        saved = await get_recipe_repository().bulk_insert(rows)
+    recipe_index.add_many(saved)
+    return saved
+
+async def build_recipe_index(page_size: int = 1000) -> int:
+    """
+    Load every stored recipe into the ingredient index, a page at a time;
+    returns how many were indexed.
+    """
+    repository = get_recipe_repository()
+    columns = ["id", "ingredients", "cooking_time", "difficulty", "servings", "tags", "rating"]
+    after = None
+    count = 0
+    while True:
+        try:
+            rows = await repository.scan(page_size, after=after, columns=columns)
+        except Exception as e:
+            # Saves still index new recipes, so matching works on what's loaded
+            logger.error("Error building recipe index", extra={"indexed": count, "error": truncate(str(e))})
+            return count
+        recipe_index.add_many(rows)
+        count += len(rows)
+        if len(rows) < page_size:
+            break
+        after = rows[-1]["id"]
+    logger.info("Built recipe index", extra={"indexed": count, **recipe_index.stats()})
+    return count
+
+async def match_recipes(
+    ingredients: List[str],
+    dietary_preferences: Optional[List[str]] = None,
+    cooking_time: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    servings: Optional[int] = None,
+    limit: int = 5
+) -> List[Dict]:
+    """
+    Find saved recipes that fit a generation request, best first.
+
+    Candidates come from the in-process ingredient index and are scored by
+    ingredient overlap and rating; each returned recipe carries its
+    ``match_score`` but not the ``user_id`` of whoever saved it. Returns an empty list when nothing scores high enough.
+    """
+    with stage("index_match"):
+        matches = recipe_index.match(
+            ingredients,
+            dietary_preferences=dietary_preferences,
+            cooking_time=cooking_time,
+            difficulty=difficulty,
+            servings=servings,
+            limit=limit
+        )
+    with stage("db_get"):
+        rows = await get_recipe_repository().get_many(
+            [m.recipe_id for m in matches], columns=MATCH_COLUMNS
+        ) if matches else []
+    rows_by_id = {row["id"]: row for row in rows}
+
+    recipes = []
+    for match in matches:
+        row = rows_by_id.get(match.recipe_id)
+        if row is None:
+            # Deleted from the store since it was indexed
+            recipe_index.remove(match.recipe_id)
+            continue
+        recipes.append({**row, "match_score": match.score})
+    RECIPE_MATCHES.inc("hit" if recipes else "miss")
+    return recipes
+
+def encode_cursor(recipe: Dict, sort: str, descending: bool) -> str:
+    """Encode the keyset position just after ``recipe``, and the order it's a position in."""
+    raw = json.dumps([sort, "desc" if descending else "asc", recipe[sort], recipe["id"]], default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, str]:
+    """Decode a cursor, checking it was issued for the same ``sort`` and order."""
+    try:
+        cursor_sort, direction, sort_value, recipe_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, direction) != (sort, "desc" if descending else "asc"):
+        raise ValueError(f"Cursor is for sort={cursor_sort}&order={direction}; request the same sort and order")
+    return sort_value, recipe_id
+
+async def get_user_recipes(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    difficulty: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    sort: str = "created_at",
+    descending: bool = True
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Get one page of a user's recipes, returning the page and the cursor for
+    the next one (``None`` on the last page).
+
+    Pages are keyset-paginated on ``(sort, id)`` so deep pages cost the same
+    as the first, and ``fields`` limits which columns are fetched.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by {sort}, expected one of: {', '.join(sorted(SORT_COLUMNS))}")
+    if fields:
+        unknown = [f for f in fields if f not in RECIPE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # The cursor needs the sort column and id even if not requested
+        columns = list(dict.fromkeys([*fields, "id", sort]))
+    else:
+        columns = None
+
+    # Fetch one extra row to know whether there is a next page
+    with stage("db_list"):
+        rows = await get_recipe_repository().list(
+            user_id,
+            limit + 1,
+            after=decode_cursor(cursor, sort, descending) if cursor else None,
+            columns=columns,
+            difficulty=difficulty,
+            min_rating=min_rating,
+            sort=sort,
+            descending=descending
+        )
+    next_cursor = encode_cursor(rows[limit - 1], sort, descending) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+async def rate_recipe(recipe_id: str, rating: float) -> Optional[Dict]:
+    """
+    Add a rating to a recipe.
+
+    Applied immediately as a single atomic increment, or queued for the next
+    batched flush when write-behind is enabled (``RATING_WRITE_BEHIND``).
+    Returns the updated recipe, or ``None`` if it doesn't exist; in
+    write-behind mode returns a receipt for the queued rating instead.
+    Raises ``ValueError`` if ``recipe_id`` isn't a recipe id (a UUID).
+    """
+    try:
+        uuid.UUID(recipe_id)
+    except ValueError:
+        raise ValueError(f"Invalid recipe id: {recipe_id}")
+    if RATING_WRITE_BEHIND:
+        # Only queue ratings for recipes that exist; the index knows most
+        if recipe_id not in recipe_index:
+            with stage("db_get"):
+                if not await get_recipe_repository().get_many([recipe_id], columns=["id"]):
+                    return None
+        pending = rating_aggregator.add(recipe_id, rating)
+        return {"recipe_id": recipe_id, "queued": True, "pending_ratings": pending}
+    with stage("db_rate"):
+        return await apply_rating(recipe_id, rating, 1)
+
+async def export_user_recipes(user_id: str, page_size: int = EXPORT_PAGE_SIZE) -> AsyncIterator[Dict]:
+    """
+    Yield all of a user's recipes, newest first, fetching them one keyset
+    page at a time so memory stays flat however large the library is.
+    """
+    cursor = None
+    while True:
+        rows, cursor = await get_user_recipes(user_id, limit=page_size, cursor=cursor)
+        for row in rows:
+            yield row
+        if cursor is None:
+            return
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into ``(line_number, line)`` pairs. Lines longer than
+    ``IMPORT_MAX_LINE_BYTES`` are skipped and yielded as ``None``.
+    """
+    buffer = b""
+    line_number = 0
+    overlong = False
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, None if overlong or len(line) > IMPORT_MAX_LINE_BYTES else line
+            overlong = False
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            buffer = b""
+            overlong = True
+    if buffer or overlong:
+        yield line_number + 1, None if overlong else buffer
+
+async def import_user_recipes(
+    chunks: AsyncIterator[bytes],
+    user_id: str,
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Import recipes for a user from an NDJSON byte stream.
+
+    Each line is validated against ``RecipeCreate`` and valid rows are
+    inserted ``batch_size`` at a time, so neither the upload nor the rows are
+    held in memory. Returns the number imported and failed, with the line
+    number and reason for up to ``IMPORT_MAX_ERRORS`` failures.
+    """
+    imported = 0
+    failed = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, Dict]] = []
+
+    def fail(line_number: int, error: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": line_number, "error": error})
+
+    async def flush() -> None:
+        nonlocal imported
+        if not batch:
+            return
+        try:
+            await save_recipes([recipe for _, recipe in batch], user_id)
+            imported += len(batch)
+        except Exception as e:
+            logger.warning("Error importing recipes", extra={"rows": len(batch), "error": truncate(str(e))})
+            for line_number, _ in batch:
+                fail(line_number, f"Insert failed: {truncate(str(e), 200)}")
+        batch.clear()
+
+    async for line_number, line in _ndjson_lines(chunks):
+        if line is None:
+            fail(line_number, f"Line longer than {IMPORT_MAX_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            recipe = RecipeCreate.model_validate_json(line)
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            fail(line_number, f"{location}: {error['msg']}" if location else error["msg"])
+            continue
+        batch.append((line_number, recipe.model_dump(exclude_none=True)))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    logger.info("Imported recipes", extra={"user_id": user_id, "imported": imported, "failed": failed})
+    return {"imported": imported, "failed": failed, "errors": errors}
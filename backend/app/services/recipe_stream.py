@@ -0,0 +1,180 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Top-level array fields whose elements are emitted one by one
+STREAMED_ARRAYS = {
+    "ingredients": "ingredient",
+    "instructions": "instruction",
+}
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class IncrementalRecipeParser:
+    """
+    Incremental scanner for a streamed recipe JSON object.
+
+    Text is fed in arbitrary chunks. Each character is scanned once, and
+    events are produced as soon as a top-level field or an element of
+    ``ingredients`` / ``instructions`` is complete. Anything before the first
+    ``{`` (e.g. a markdown fence) is skipped. Once the top-level object closes,
+    ``done`` is set and ``text`` holds the complete object.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._start = -1
+        self._end = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._value_start = -1
+        self._in_streamed_array = False
+        self._item_start = -1
+        self._item_index = 0
+
+    @property
+    def done(self) -> bool:
+        return self._end >= 0
+
+    @property
+    def text(self) -> str:
+        """The complete top-level object, once ``done`` is set."""
+        return self._buf[self._start:self._end + 1] if self.done else ""
+
+    @property
+    def raw(self) -> str:
+        """Everything received so far."""
+        return self._buf
+
+    def feed(self, chunk: str) -> List[Event]:
+        """Consume the next chunk of text and return any completed events."""
+        if self.done:
+            return []
+        self._buf += chunk
+        events: List[Event] = []
+        buf = self._buf
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+
+            if self._start < 0:
+                if c == "{":
+                    self._start = i
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = _loads(buf[self._string_start:i + 1])
+                        self._expect_key = False
+                continue
+
+            if c.isspace():
+                continue
+
+            if self._depth == 1:
+                if self._expect_key:
+                    if c == '"':
+                        self._in_string = True
+                        self._string_start = i
+                    elif c == "}":
+                        self._finish(i)
+                        break
+                    continue
+                if c == ":" and self._value_start < 0:
+                    continue
+                if c in ",}":
+                    self._end_field(buf[self._value_start:i] if self._value_start >= 0 else "", events)
+                    if c == "}":
+                        self._finish(i)
+                        break
+                    continue
+                if self._value_start < 0:
+                    self._value_start = i
+                if c == '"':
+                    self._in_string = True
+                elif c in "[{":
+                    self._depth += 1
+                    self._in_streamed_array = c == "[" and self._key in STREAMED_ARRAYS
+                continue
+
+            if self._depth == 2 and self._in_streamed_array:
+                if c in ",]":
+                    if self._item_start >= 0:
+                        self._emit_item(buf[self._item_start:i], events)
+                        self._item_start = -1
+                    if c == "]":
+                        self._depth -= 1
+                        self._in_streamed_array = False
+                    continue
+                if self._item_start < 0:
+                    self._item_start = i
+
+            if c == '"':
+                self._in_string = True
+            elif c in "[{":
+                self._depth += 1
+            elif c in "]}":
+                self._depth -= 1
+
+        self._pos = len(buf) if not self.done else self._end + 1
+        return events
+
+    def _finish(self, i: int) -> None:
+        self._end = i
+        self._depth = 0
+
+    def _end_field(self, raw: str, events: List[Event]) -> None:
+        key = self._key
+        self._key = None
+        self._value_start = -1
+        self._expect_key = True
+        self._item_index = 0
+        if key is None or key in STREAMED_ARRAYS:
+            return
+        value = _loads(raw)
+        if value is not _INVALID:
+            events.append(("field", {"name": key, "value": value}))
+
+    def _emit_item(self, raw: str, events: List[Event]) -> None:
+        value = _loads(raw)
+        if value is not _INVALID:
+            events.append((STREAMED_ARRAYS[self._key], {"index": self._item_index, "value": value}))
+        self._item_index += 1
+
+
+_INVALID = object()
+
+
+def _loads(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return _INVALID
+
+
+def recipe_events(recipe: Dict[str, Any]) -> Iterator[Event]:
+    """Produce the same event sequence for an already complete recipe."""
+    for key, value in recipe.items():
+        if key in STREAMED_ARRAYS and isinstance(value, list):
+            for index, item in enumerate(value):
+                yield STREAMED_ARRAYS[key], {"index": index, "value": item}
+        else:
+            yield "field", {"name": key, "value": value}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
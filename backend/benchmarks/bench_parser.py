@@ -0,0 +1,114 @@
+"""
+Micro-benchmark for parsing raw LLM recipe responses.
+
+Runs every response in ``llm_responses.jsonl`` through the current parser
+(``app.services.recipe_parser.parse_recipe``) and through the previous
+replace/find/retry chain, and reports the parse success rate and the mean
+cost per response for each.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_parser [--iterations 2000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.recipe_parser import REQUIRED_FIELDS, parse_recipe  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_responses.jsonl")
+
+
+def legacy_parse(text):
+    """The cleanup chain generate_recipe used before recipe_parser existed."""
+    text = text.replace("```json", "").replace("```", "").strip()
+    start_idx = text.find("{")
+    end_idx = text.rfind("}") + 1
+    if start_idx >= 0 and end_idx > start_idx:
+        text = text[start_idx:end_idx]
+    else:
+        raise ValueError("No valid JSON object found in the response")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        text = text.replace("'", '"').replace("None", "null")
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(str(e))
+    missing = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    return data
+
+
+def load_corpus(path=CORPUS):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(parser, corpus, iterations):
+    outcomes = {}
+    for case in corpus:
+        try:
+            parser(case["text"])
+            outcomes[case["name"]] = "ok"
+        except ValueError:
+            outcomes[case["name"]] = "error"
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for case in corpus:
+            try:
+                parser(case["text"])
+            except ValueError:
+                pass
+    elapsed = time.perf_counter() - start
+
+    expected_ok = [c for c in corpus if c["expect"] == "ok"]
+    correct = sum(1 for c in corpus if outcomes[c["name"]] == c["expect"])
+    recovered = sum(1 for c in expected_ok if outcomes[c["name"]] == "ok")
+    return {
+        "success_rate": recovered / len(expected_ok) if expected_ok else 1.0,
+        "accuracy": correct / len(corpus),
+        "us_per_response": elapsed / (iterations * len(corpus)) * 1e6,
+        "outcomes": outcomes,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    arg_parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = arg_parser.parse_args()
+
+    corpus = load_corpus()
+    results = {
+        "corpus_size": len(corpus),
+        "iterations": args.iterations,
+        "parsers": {
+            "recipe_parser": run(parse_recipe, corpus, args.iterations),
+            "legacy": run(legacy_parse, corpus, args.iterations),
+        },
+    }
+
+    print(f"{'parser':<15}{'success':>10}{'accuracy':>10}{'us/resp':>10}")
+    for name, r in results["parsers"].items():
+        print(f"{name:<15}{r['success_rate']:>10.1%}{r['accuracy']:>10.1%}{r['us_per_response']:>10.1f}")
+    failures = [
+        c["name"] for c in corpus
+        if results["parsers"]["recipe_parser"]["outcomes"][c["name"]] != c["expect"]
+    ]
+    if failures:
+        print("recipe_parser mismatches:", ", ".join(failures))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cold-start benchmark for the API.
+
+Starts a fresh interpreter several times and measures how long it takes to
+import ``main`` and to run the application's lifespan startup, i.e. what a
+new worker or a Render cold start waits for before serving its first request.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup [--runs 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+started = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+}))
+"""
+
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = arg_parser.parse_args()
+
+    # No real credentials are needed: startup must not touch the network
+    env = dict(os.environ)
+    env.setdefault("RECIPE_STORE", "memory")
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+
+    samples = [run_once(env) for _ in range(args.runs)]
+    results = {"runs": args.runs}
+    for key in ("import_ms", "startup_ms"):
+        values = [s[key] for s in samples]
+        results[key] = {
+            "median": statistics.median(values),
+            "min": min(values),
+            "max": max(values),
+        }
+
+    for key in ("import_ms", "startup_ms"):
+        r = results[key]
+        print(f"{key:<12} median {r['median']:8.1f}  min {r['min']:8.1f}  max {r['max']:8.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-in for the Gemini model, for running the API without network
+access or API spend.
+
+``FakeGeminiModel`` has the same ``generate_content`` signature the recipe
+service uses. It sleeps for a configurable latency, then returns a fenced
+JSON recipe built from the prompt's ingredients; a configurable share of
+responses are malformed (repairable) or unusable, to exercise the parser's
+slow and failure paths. In JSON mode (``response_mime_type``) it returns bare
+JSON, truncated at ``max_output_tokens`` like the real model; there the
+malformed share is cut off early and the unusable share lacks required fields.
+Upstream faults can be injected too: a share of calls fail with the errors
+the Gemini SDK raises, and a share take many times the usual latency, to
+exercise retries, hedged requests and the circuit breaker.
+"""
+import json
+import random
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+INGREDIENTS_LINE = re.compile(r"ingredients:\s*(.+)", re.IGNORECASE)
+
+
+def fake_recipe(ingredients: List[str]) -> Dict:
+    """A plausible, valid recipe using ``ingredients``."""
+    return {
+        "title": f"{ingredients[0].title()} skillet",
+        "description": f"A quick one-pan dish with {', '.join(ingredients)}.",
+        "ingredients": [
+            {"name": name, "amount": str(i + 1), "unit": "cup"}
+            for i, name in enumerate(ingredients)
+        ],
+        "instructions": [
+            "Prepare the ingredients.",
+            f"Cook the {ingredients[0]} over medium heat for 5 minutes.",
+            "Add everything else and cook until done.",
+            "Season to taste and serve.",
+        ],
+        "cooking_time": {"prep_time": 10, "cook_time": 20, "total_time": 30},
+        "difficulty": "easy",
+        "servings": 2,
+        "tips": ["Use a wide pan so everything browns."],
+    }
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str = "", output_chars: Optional[int] = None):
+        self.text = text
+        # Roughly four characters per token, like Gemini's English text
+        output_chars = len(text) if output_chars is None else output_chars
+        self.usage_metadata = FakeUsage(len(prompt) // 4, output_chars // 4)
+
+
+class FakeGeminiModel:
+    """
+    Args:
+        latency: Mean time to a full response, in seconds.
+        jitter: Standard deviation of the latency, as a fraction of the mean.
+        malformed_rate: Share of responses with prose, single quotes and
+            trailing commas (truncated JSON in JSON mode) that the parser
+            has to repair.
+        invalid_rate: Share of responses that can't be parsed at all (or,
+            in JSON mode, don't validate).
+        error_rate: Share of calls that fail with a retryable Google API
+            error (503 Service Unavailable or 429 Resource Exhausted).
+        slow_rate: Share of calls that take ``slow_factor`` times longer.
+        slow_factor: Latency multiplier for slow calls.
+        chunk_size: Characters per chunk when streaming.
+        seed: Seed for the latency, fault and malformed-output draws.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.2,
+        malformed_rate: float = 0.0,
+        invalid_rate: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_factor: float = 10.0,
+        chunk_size: int = 40,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.malformed_rate = malformed_rate
+        self.invalid_rate = invalid_rate
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _delay(self) -> float:
+        delay = max(0.0, self._random.gauss(self.latency, self.latency * self.jitter))
+        if self._random.random() < self.slow_rate:
+            delay *= self.slow_factor
+        return delay
+
+    def _fault(self) -> Optional[Exception]:
+        """The error this call fails with, if it draws one."""
+        if self._random.random() >= self.error_rate:
+            return None
+        self.errors += 1
+        if self._random.random() < 0.5:
+            return google_exceptions.ResourceExhausted("Quota exceeded (injected by the fake model)")
+        return google_exceptions.ServiceUnavailable("The model is overloaded (injected by the fake model)")
+
+    def _ingredients(self, prompt: str) -> List[str]:
+        match = INGREDIENTS_LINE.search(prompt)
+        if not match:
+            return ["water"]
+        return [name.strip() for name in match.group(1).split(",") if name.strip()]
+
+    def _text(self, prompt: str, generation_config: Optional[Dict] = None) -> str:
+        config = generation_config or {}
+        recipe = fake_recipe(self._ingredients(prompt))
+        draw = self._random.random()
+        if config.get("response_mime_type") == "application/json":
+            # JSON mode: bare JSON, cut off if it runs past the token budget.
+            # The schema rules out prose, so failures are truncation (which
+            # the parser can close) and missing required fields.
+            if draw < self.invalid_rate:
+                del recipe["ingredients"], recipe["instructions"]
+            text = json.dumps(recipe)
+            max_tokens = config.get("max_output_tokens")
+            if max_tokens:
+                text = text[:max_tokens * 4]
+            if self.invalid_rate <= draw < self.invalid_rate + self.malformed_rate:
+                # Cut off mid-way through the tips, after the required fields
+                text = text[:text.index('"tips"') + 20]
+            return text
+        if draw < self.invalid_rate:
+            return "I'm sorry, I can't help with that request."
+        if draw < self.invalid_rate + self.malformed_rate:
+            text = json.dumps(recipe, indent=2).replace('"tips"', "'tips'")
+            text = text.replace("]\n}", "],\n}")
+            return f"Here is your recipe:\n```json\n{text}\n```\nEnjoy!"
+        return f"```json\n{json.dumps(recipe, indent=2)}\n```"
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False, **kwargs):
+        self.calls += 1
+        text = self._text(prompt, generation_config)
+        delay = self._delay()
+        fault = self._fault()
+        if fault is not None:
+            # Errors come back after a fraction of the usual latency
+            time.sleep(delay / 4)
+            raise fault
+        if stream:
+            return self._stream(prompt, text, delay)
+        time.sleep(delay)
+        return FakeResponse(text, prompt)
+
+    def _stream(self, prompt: str, text: str, delay: float) -> Iterator[FakeResponse]:
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        sent = 0
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            sent += len(chunk)
+            # Like Gemini, each chunk reports the usage so far
+            yield FakeResponse(chunk, prompt, output_chars=sent)
@@ -0,0 +1,271 @@
+"""
+Offline load test for the API.
+
+Boots ``main:app`` in process with the in-memory recipe store and a local
+stand-in for Gemini (``benchmarks.fake_llm``), then drives each scenario at a
+fixed concurrency and reports p50/p95/p99 latency, requests per second,
+status codes and memory. Nothing leaves the machine, so results are
+comparable between releases; regressions in the event loop, parsing or
+storage paths show up as changes in latency or throughput.
+
+Scenarios:
+    generate  POST /recipes/generate with distinct ingredient sets (cache misses)
+    stream    POST /recipes/generate/stream, read to the final event
+    list      GET /recipes/{user_id}, first page and follow-up pages
+    rate      POST /recipes/{recipe_id}/rate
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test [--scenarios generate,list,rate]
+        [--concurrency 32] [--requests 500] [--llm-latency 0.5]
+        [--malformed-rate 0.1] [--invalid-rate 0.01] [--error-rate 0.05]
+        [--slow-rate 0.02] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app is imported; no real credentials are needed
+os.environ["RECIPE_STORE"] = "memory"
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_llm import FakeGeminiModel, fake_recipe  # noqa: E402
+
+SCENARIOS = ("generate", "stream", "list", "rate")
+
+PANTRY = [
+    "chicken", "rice", "eggs", "spinach", "garlic", "onion", "tomato", "tofu",
+    "potato", "carrot", "beans", "pasta", "cheese", "mushroom", "lentils",
+    "broccoli", "salmon", "bell pepper", "zucchini", "chickpeas",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size, in MiB (Linux only; 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def random_ingredients(rng: random.Random, n: int) -> List[str]:
+    # A unique suffix keeps every request out of the generation cache
+    return rng.sample(PANTRY, 3) + [f"spice {n}"]
+
+
+async def run_scenario(
+    make_request: Callable[[httpx.AsyncClient, int], "asyncio.Future"],
+    client: httpx.AsyncClient,
+    total: int,
+    concurrency: int,
+) -> Dict:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(total))
+
+    async def worker():
+        for n in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, n)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith(("2", "3")))
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+        "success_rate": ok / total if total else 0.0,
+        "status_codes": dict(statuses),
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        },
+        "rss_mb": {"before": rss_before, "after": rss_mb()},
+    }
+
+
+async def seed(user_count: int, recipes_per_user: int) -> List[str]:
+    """Store recipes directly in the in-memory repository; returns their ids."""
+    from app.services.recipe_service import save_recipes
+
+    ids = []
+    for u in range(user_count):
+        recipes = [
+            fake_recipe([PANTRY[(u + i + k) % len(PANTRY)] for k in range(3)])
+            for i in range(recipes_per_user)
+        ]
+        rows = await save_recipes(recipes, f"user-{u}")
+        ids.extend(row["id"] for row in rows)
+    return ids
+
+
+async def main_async(args) -> Dict:
+    import main
+    from app.services import llm
+    from app.services.generation_engine import engine
+    from app.services.llm_client import llm_client
+    from app.services.metrics import LLM_HEDGES, LLM_RETRIES, PARSE_RESULTS
+    from app.services.recipe_cache import recipe_cache
+
+    model = FakeGeminiModel(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        malformed_rate=args.malformed_rate,
+        invalid_rate=args.invalid_rate,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_factor=args.slow_factor,
+        seed=args.seed,
+    )
+    llm.set_model(model)
+    rng = random.Random(args.seed)
+
+    async def generate(client, n):
+        return await client.post("/recipes/generate", json={
+            "ingredients": random_ingredients(rng, n), "servings": 2,
+        })
+
+    async def stream(client, n):
+        async with client.stream("POST", "/recipes/generate/stream", json={
+            "ingredients": random_ingredients(rng, n), "servings": 2,
+        }) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response
+
+    async def list_page(client, n):
+        user_id = f"user-{n % args.users}"
+        response = await client.get(f"/recipes/{user_id}", params={"limit": args.page_size})
+        cursor = response.headers.get("x-next-cursor")
+        if cursor and n % 2:
+            response = await client.get(
+                f"/recipes/{user_id}", params={"limit": args.page_size, "cursor": cursor}
+            )
+        return response
+
+    recipe_ids: List[str] = []
+
+    async def rate(client, n):
+        recipe_id = recipe_ids[n % len(recipe_ids)]
+        return await client.post(f"/recipes/{recipe_id}/rate", params={"rating": rng.randint(1, 5)})
+
+    requests = {"generate": generate, "stream": stream, "list": list_page, "rate": rate}
+
+    results = {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k != "json_path"},
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": {
+                "max_concurrency": engine.max_concurrency,
+                "max_queue": engine.max_queue,
+            },
+        },
+        "scenarios": {},
+    }
+
+    async with main.app.router.lifespan_context(main.app):
+        recipe_ids.extend(await seed(args.users, args.recipes_per_user))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            for name in args.scenarios:
+                results["scenarios"][name] = await run_scenario(
+                    requests[name], client, args.requests, args.concurrency
+                )
+
+        results["llm_calls"] = model.calls
+        results["llm_errors"] = model.errors
+        results["llm_retries"] = {labels[0]: value for labels, value in LLM_RETRIES._values.items()}
+        results["llm_hedges"] = sum(LLM_HEDGES._values.values())
+        results["llm_client"] = llm_client.stats()
+        results["parse_results"] = {labels[0]: value for labels, value in PARSE_RESULTS._values.items()}
+        results["cache"] = recipe_cache.stats()
+        results["engine"] = engine.stats()
+
+    results["memory_mb"] = {"rss": rss_mb(), "peak_rss": peak_rss_mb()}
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--scenarios", default="generate,list,rate",
+                            help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    arg_parser.add_argument("--concurrency", type=int, default=32)
+    arg_parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.5, help="mean fake LLM latency, seconds")
+    arg_parser.add_argument("--llm-jitter", type=float, default=0.2, help="latency stddev as a fraction of the mean")
+    arg_parser.add_argument("--malformed-rate", type=float, default=0.1, help="share of repairable responses")
+    arg_parser.add_argument("--invalid-rate", type=float, default=0.01, help="share of unparseable responses")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="share of LLM calls failing with a 503/429")
+    arg_parser.add_argument("--slow-rate", type=float, default=0.0, help="share of LLM calls with tail latency")
+    arg_parser.add_argument("--slow-factor", type=float, default=10.0, help="latency multiplier for slow calls")
+    arg_parser.add_argument("--users", type=int, default=20)
+    arg_parser.add_argument("--recipes-per-user", type=int, default=200)
+    arg_parser.add_argument("--page-size", type=int, default=50)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = arg_parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        arg_parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main_async(args))
+
+    print(f"{'scenario':<10} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ok':>7}")
+    for name, r in results["scenarios"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<10} {r['rps']:8.1f} {lat['p50']:9.1f} {lat['p95']:9.1f} {lat['p99']:9.1f} "
+              f"{r['success_rate']:7.1%}")
+    print(f"peak RSS {results['memory_mb']['peak_rss']:.1f} MiB, LLM calls {results['llm_calls']}, "
+          f"parse results {results['parse_results']}")
+    print(f"LLM errors {results['llm_errors']}, retries {results['llm_retries']}, hedges {results['llm_hedges']}, "
+          f"breakers {results['llm_client']['breakers']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Offline checks for the LLM client's failure handling.
+
+Drives ``app.services.llm_client`` against ``benchmarks.fake_llm`` with
+injected errors and tail latency, and checks that:
+
+    breaker   CircuitBreaker opens on the failure rate, lets one probe
+              through after the cooldown, and closes or reopens on its result
+    hedge     a slow first request is hedged, the fast one wins and the slow
+              one is cancelled
+    retry     upstream errors are retried, then surface as LLMUpstreamError
+              and map to 503 on POST /recipes/generate
+    fallback  an open breaker with no fallback model fails fast
+
+Nothing leaves the machine. Exits non-zero if any check fails.
+
+Usage (from the backend directory):
+    python -m benchmarks.resilience_check [--checks breaker,hedge]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app is imported; no real credentials are needed
+os.environ["RECIPE_STORE"] = "memory"
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("GEMINI_BACKOFF_BASE", "0.01")
+os.environ.setdefault("GEMINI_BACKOFF_MAX", "0.05")
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_llm import FakeGeminiModel  # noqa: E402
+
+CHECKS = ("breaker", "hedge", "retry", "fallback")
+
+
+class SlowFirstCall(FakeGeminiModel):
+    """Answers in ``latency`` seconds, except the first call, which takes ``first_latency``."""
+
+    def __init__(self, first_latency: float, **kwargs):
+        super().__init__(jitter=0.0, **kwargs)
+        self.first_latency = first_latency
+
+    def _delay(self) -> float:
+        return self.first_latency if self.calls == 1 else self.latency
+
+
+def parse(text: str) -> str:
+    return text
+
+
+async def check_breaker() -> None:
+    from app.services.llm_client import CircuitBreaker
+
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, cooldown=0.1)
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == "closed", "opened before min_calls outcomes"
+    breaker.record_failure()
+    assert breaker.state == "open", "didn't open at the failure rate"
+    assert breaker.opened == 1
+    assert not breaker.allow(), "let a call through while open"
+
+    await asyncio.sleep(0.12)
+    assert breaker.state == "half_open"
+    assert breaker.allow(), "didn't let the probe through"
+    assert not breaker.allow(), "let a second probe through"
+    breaker.record_failure()
+    assert breaker.state == "open", "a failed probe didn't reopen the breaker"
+
+    await asyncio.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed", "a successful probe didn't close the breaker"
+    assert breaker.allow()
+
+
+async def check_hedge() -> None:
+    from app.services import llm
+    from app.services.llm_client import LLMClient
+    from app.services.metrics import LLM_HEDGES
+
+    model = SlowFirstCall(first_latency=2.0, latency=0.01)
+    llm.set_model(model)
+    client = LLMClient(hedge_percentile=95, hedge_min_delay=0.05)
+    for _ in range(client.latency.min_samples):
+        client.latency.observe(0.01)
+    hedges = sum(LLM_HEDGES._values.values())
+
+    start = time.perf_counter()
+    generation = asyncio.ensure_future(client.generate("Ingredients: eggs", {}, parse))
+    await asyncio.sleep(0.03)
+    attempts = [task for task in asyncio.all_tasks() if task.get_coro().__qualname__ == "LLMClient._attempt"]
+    await generation
+    elapsed = time.perf_counter() - start
+    # Cancellation reaches the losing attempt on a later loop iteration
+    await asyncio.sleep(0.05)
+
+    assert model.calls == 2, f"expected one hedge, got {model.calls} calls"
+    assert sum(LLM_HEDGES._values.values()) == hedges + 1
+    assert elapsed < 1.0, f"the hedge didn't win ({elapsed:.2f}s)"
+    assert len(attempts) == 1, "hedged before the hedge delay"
+    assert attempts[0].cancelled(), "the losing request wasn't cancelled"
+
+
+async def check_retry() -> None:
+    import main
+    from app.services import llm
+    from app.services.llm_client import LLMClient, LLMUpstreamError
+
+    model = FakeGeminiModel(latency=0.01, error_rate=1.0, seed=1)
+    llm.set_model(model)
+    client = LLMClient(max_retries=2, backoff_base=0.01, hedge_percentile=0)
+    try:
+        await client.generate("Ingredients: eggs", {}, parse)
+        raise AssertionError("expected LLMUpstreamError")
+    except LLMUpstreamError as e:
+        assert e.status_code in (502, 503)
+    assert model.calls == 3, f"expected 3 attempts, got {model.calls}"
+
+    # Through the API: every attempt is a 429 or 503, so the answer is a 503
+    model = FakeGeminiModel(latency=0.01, error_rate=1.0, seed=2)
+    llm.set_model(model)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as http:
+            response = await http.post("/recipes/generate", json={"ingredients": ["retry check"]})
+    assert response.status_code == 503, f"expected 503, got {response.status_code}: {response.text}"
+
+
+async def check_fallback() -> None:
+    from app.services import llm
+    from app.services.llm_client import LLMClient, LLMUnavailable
+
+    model = FakeGeminiModel(latency=0.01, error_rate=1.0, seed=3)
+    llm.set_model(model)
+    client = LLMClient(max_retries=0, hedge_percentile=0, breaker_min_calls=3, breaker_cooldown=60)
+    for _ in range(3):
+        try:
+            await client.generate("Ingredients: eggs", {}, parse)
+        except Exception:
+            pass
+    assert client.breakers["primary"].state == "open"
+
+    calls = model.calls
+    start = time.perf_counter()
+    try:
+        await client.generate("Ingredients: eggs", {}, parse)
+        raise AssertionError("expected LLMUnavailable")
+    except LLMUnavailable as e:
+        assert e.retry_after > 0
+    assert model.calls == calls, "called the model with the breaker open"
+    assert time.perf_counter() - start < 0.05, "didn't fail fast"
+
+
+async def main_async(checks) -> Dict[str, str]:
+    from app.services.logger import setup_logging
+
+    # Route the client's warnings through the app's handler, at LOG_LEVEL
+    setup_logging()
+    functions: Dict[str, Callable] = {
+        "breaker": check_breaker,
+        "hedge": check_hedge,
+        "retry": check_retry,
+        "fallback": check_fallback,
+    }
+    results = {}
+    for name in checks:
+        try:
+            await functions[name]()
+            results[name] = "ok"
+        except AssertionError as e:
+            results[name] = f"FAILED: {e}"
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--checks", default=",".join(CHECKS), help=f"comma-separated, from: {', '.join(CHECKS)}")
+    args = arg_parser.parse_args()
+    checks = [c.strip() for c in args.checks.split(",") if c.strip()]
+    unknown = set(checks) - set(CHECKS)
+    if unknown:
+        arg_parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main_async(checks))
+    for name, result in results.items():
+        print(f"{name:<10} {result}")
+    sys.exit(0 if all(result == "ok" for result in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,52 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
 from dotenv import load_dotenv
+import asyncio
 import os
+import time
+import uuid
 from app.routers import recipes
+from app.services import llm
+from app.services.generation_engine import engine
+from app.services.llm_client import llm_client
+from app.services.logger import setup_logging, shutdown_logging, request_id_var
+from app.services.metrics import (
+    CallbackMetric, HTTP_REQUEST_SECONDS, register, render_metrics, server_timing_header, track_request
+)
+from app.services.recipe_cache import recipe_cache
+from app.services.recipe_index import recipe_index, RECIPE_INDEX_WARM
+from app.services.recipe_service import build_recipe_index
+from app.services.rating_service import rating_aggregator, RATING_WRITE_BEHIND
+from app.services.recipe_repository import get_recipe_repository, close_recipe_repository
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="ChefGPT API")
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here touches the network: the Gemini model and the database
+    # client are created on first use, and the schema is managed separately
+    # with `python -m app.migrate`.
+    setup_logging()
+    if RATING_WRITE_BEHIND:
+        rating_aggregator.start()
+    # Built in the background so startup doesn't wait on the database
+    index_task = asyncio.ensure_future(build_recipe_index()) if RECIPE_INDEX_WARM else None
+    yield
+    if index_task is not None:
+        index_task.cancel()
+    if RATING_WRITE_BEHIND:
+        await rating_aggregator.stop()
+    await close_recipe_repository()
+    engine.shutdown()
+    shutdown_logging()
+
+app = FastAPI(title="ChefGPT API", lifespan=lifespan)
 
 origins = [
     "https://chefgpt-two.vercel.app",
@@ -24,6 +63,68 @@ app.add_middleware(
     max_age=3600,
 )
 
+class RequestContextMiddleware:
+    """
+    Tag every log line of a request with its id, record its latency, and
+    return the id and a per-stage Server-Timing breakdown as headers.
+
+    A plain ASGI middleware rather than ``@app.middleware("http")``, whose
+    per-request task group and body proxying cost more than the work done here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = 500
+
+        with track_request() as timings:
+            async def send_with_headers(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Request-ID"] = request_id
+                    headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - start)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                request_id_var.reset(token)
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start, scope["method"], getattr(route, "path", "unmatched"), str(status)
+                )
+
+app.add_middleware(RequestContextMiddleware)
+
+# Expose counters kept by other components; read only when /metrics is scraped
+for name, documentation, callback, kind in [
+    ("chefgpt_generation_in_flight", "LLM calls currently running.", lambda: engine.stats()["in_flight"], "gauge"),
+    ("chefgpt_generation_waiting", "Requests waiting for a generation slot.", lambda: engine.stats()["waiting"], "gauge"),
+    ("chefgpt_generation_rejected_total", "Requests rejected because generation was at capacity.", lambda: engine.stats()["rejected"], "counter"),
+    ("chefgpt_generation_timed_out_total", "LLM calls that exceeded their deadline.", lambda: engine.stats()["timed_out"], "counter"),
+    ("chefgpt_llm_circuit_open", "1 while the primary model's circuit breaker is open or probing.", lambda: int(llm_client.breakers["primary"].state != "closed"), "gauge"),
+    ("chefgpt_llm_fallback_calls_total", "LLM calls sent to the fallback model.", lambda: llm_client.fallback_calls, "counter"),
+    ("chefgpt_recipe_cache_entries", "Recipes held in the generation cache.", lambda: recipe_cache.stats()["entries"], "gauge"),
+    ("chefgpt_recipe_cache_bytes", "Approximate size of the generation cache.", lambda: recipe_cache.stats()["bytes"], "gauge"),
+    ("chefgpt_recipe_cache_hits_total", "Generation cache hits.", lambda: recipe_cache.stats()["hits"], "counter"),
+    ("chefgpt_recipe_cache_misses_total", "Generation cache misses.", lambda: recipe_cache.stats()["misses"], "counter"),
+    ("chefgpt_recipe_cache_coalesced_total", "Requests that joined an identical in-flight generation.", lambda: recipe_cache.stats()["coalesced"], "counter"),
+    ("chefgpt_recipe_index_recipes", "Saved recipes in the ingredient index.", lambda: len(recipe_index), "gauge"),
+    ("chefgpt_ratings_pending", "Ratings buffered for the next write-behind flush.", lambda: rating_aggregator.stats()["pending"], "gauge"),
+    ("chefgpt_ratings_dropped_total", "Write-behind ratings dropped after a permanent error or too many failed flushes.", lambda: rating_aggregator.stats()["dropped"], "counter"),
+]:
+    register(CallbackMetric(name, documentation, callback, kind))
+
 # Include routers
 app.include_router(recipes.router)
 
@@ -34,4 +135,38 @@ async def root():
 @app.get("/test")
 async def test():
     """Test endpoint to check if server is running."""
-    return {"status": "ok", "message": "Server is running"} 
\ No newline at end of file
+    return {"status": "ok", "message": "Server is running"} 
+
+@app.get("/livez")
+async def livez():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: report the status of each dependency."""
+    checks = {}
+    try:
+        await asyncio.wait_for(get_recipe_repository().ping(), timeout=READINESS_TIMEOUT)
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {str(e) or type(e).__name__}"
+
+    checks["llm"] = "ok" if llm.is_configured() else "error: GOOGLE_API_KEY is not set"
+
+    ready = all(status == "ok" for status in checks.values())
+
+    # Saturation is load, not a broken dependency: report it without failing
+    # readiness, or every instance would drop out under a traffic spike
+    stats = engine.stats()
+    saturated = stats["in_flight"] >= stats["max_concurrency"] and stats["waiting"] >= stats["max_queue"]
+    stats["status"] = "saturated" if saturated else "ok"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ok" if ready else "unavailable", "checks": checks, "generation": stats}
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for the recipe pipeline."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
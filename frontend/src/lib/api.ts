@@ -23,15 +23,30 @@ export async function generateRecipe(data: {
   return response.json();
 }
 
+// The API returns recipes a page at a time; follow X-Next-Cursor to get them all
+const RECIPES_PAGE_SIZE = 200;
+
 export async function getUserRecipes(userId: string) {
-  const response = await fetch(`${API_URL}/recipes/${userId}`);
+  const recipes: any[] = [];
+  let cursor: string | null = null;
 
-  if (!response.ok) {
-    const errorData = await response.text();
-    throw new Error(`Failed to fetch recipes: ${errorData}`);
-  }
+  do {
+    const params = new URLSearchParams({ limit: String(RECIPES_PAGE_SIZE) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(`${API_URL}/recipes/${encodeURIComponent(userId)}?${params}`);
 
-  return response.json();
+    if (!response.ok) {
+      const errorData = await response.text();
+      throw new Error(`Failed to fetch recipes: ${errorData}`);
+    }
+
+    recipes.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return recipes;
 }
 
 export async function rateRecipe(recipeId: string, rating: number) {